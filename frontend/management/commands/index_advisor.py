@@ -0,0 +1,58 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from frontend.query_plans import inspect, suggested_migrations
+
+
+class Command(BaseCommand):
+    help = (
+        'Chạy EXPLAIN trên các truy vấn nóng của các view, báo các bước quét cả bảng / '
+        'sắp xếp bằng bảng tạm và đề xuất migration thêm index'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Thoát với lỗi nếu một truy vấn nóng có query plan kém (dùng trong CI)',
+        )
+        parser.add_argument(
+            '--write', action='store_true',
+            help='Ghi migration đề xuất vào thư mục migrations của app thay vì chỉ in ra',
+        )
+
+    def handle(self, *args, **options):
+        reports = inspect()
+        regressions = 0
+        for report in reports:
+            if not report.problems:
+                self.stdout.write(f'  OK    {report.query.label}')
+            elif not report.query.hot:
+                self.stdout.write(f'  --    {report.query.label} (chấp nhận được)')
+            else:
+                regressions += 1
+                self.stdout.write(self.style.WARNING(f'  CHẬM  {report.query.label}'))
+                for problem in report.problems:
+                    self.stdout.write(f'          {problem.kind}: {problem.detail}')
+                if report.suggestion is not None:
+                    condition = f' WHERE {report.suggestion.condition}' if report.suggestion.condition else ''
+                    self.stdout.write(
+                        f'          đề xuất: {report.model.__name__} {report.suggestion.fields}{condition}'
+                    )
+            if options['verbosity'] > 1:
+                for line in report.plan.splitlines():
+                    self.stdout.write(f'          | {line}')
+
+        for writer in suggested_migrations(reports):
+            if options['write']:
+                os.makedirs(os.path.dirname(writer.path), exist_ok=True)
+                with open(writer.path, 'w', encoding='utf-8') as migration_file:
+                    migration_file.write(writer.as_string())
+                self.stdout.write(self.style.SUCCESS(f'Đã ghi {writer.path}'))
+            else:
+                self.stdout.write(f'\n# {writer.path}\n{writer.as_string()}')
+
+        if regressions and options['check']:
+            raise CommandError(f'{regressions} truy vấn nóng có query plan kém')
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('Không có truy vấn nóng nào quét cả bảng hoặc sắp xếp bằng bảng tạm'))
@@ -0,0 +1,298 @@
+"""
+Kiểm tra query plan của các truy vấn nóng (lệnh `index_advisor`).
+
+`PLANNED_QUERIES` lấy các queryset mà view trong products/views.py,
+orders/views.py và frontend/views.py chạy; với API view là `get_queryset()`
+qua các filter backend của chính view, trên một request giả
+(`view_queryset()`), với trang chủ là `Storefront`, và truy vấn prefetch
+các dòng đơn hàng được dựng từ chính `prefetch_related` của queryset
+(`prefetch_queryset()`). `inspect()` chạy `EXPLAIN QUERY PLAN` (SQLite) hoặc
+`EXPLAIN` trên từng queryset, đánh dấu các bước quét cả bảng và sắp xếp bằng
+bảng tạm, rồi đề xuất index cho queryset bị đánh dấu: các cột so sánh bằng
+trước, sau đó là cột lọc theo khoảng hoặc thứ tự sắp xếp.
+"""
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.db import migrations, models
+from django.db.models import Prefetch, Q, Sum
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+from django.db.models.lookups import Exact
+from django.test import RequestFactory
+from django.utils import timezone
+
+from orders import dashboard, hot_products, kitchen, rollups, sync
+from orders.models import DailySales, IdempotencyKey, Order, OrderTombstone
+from orders.views import OrderDetailView, OrderListView, OrderSyncView
+from products.models import Category
+from products.pagination import KeysetPagination
+from products.views import (
+    BannerListView, CategoryListView, FeaturedProductsView, ProductDetailView, ProductListView,
+)
+
+from .storefront import Storefront
+from .views import tracked_order
+
+
+# `hot=False`: a scan or sort is expected here (small tables such as categories
+# and banners, or sorting the few rows an index lookup found); reported, but
+# never fails `--check` and gets no suggestion.
+PlannedQuery = namedtuple('PlannedQuery', ['label', 'build', 'hot'])
+
+Problem = namedtuple('Problem', ['kind', 'detail'])
+
+FULL_SCAN = 'full scan'
+TEMP_SORT = 'temp sort'
+
+# (pattern, kind) for SQLite's EXPLAIN QUERY PLAN and PostgreSQL's EXPLAIN
+PLAN_PATTERNS = [
+    (re.compile(r'\bSCAN (?!CONSTANT ROW)\w+$'), FULL_SCAN),
+    (re.compile(r'\bSeq Scan on \w+'), FULL_SCAN),
+    (re.compile(r'\bUSE TEMP B-TREE\b'), TEMP_SORT),
+    (re.compile(r'^\W*Sort\b'), TEMP_SORT),
+]
+
+
+_factory = RequestFactory()
+
+
+def view_queryset(view_class, query='', **kwargs):
+    """
+    Queryset mà `view_class` chạy cho `GET ?<query>`: `get_queryset()` qua các
+    filter backend (filterset, ordering, search) của view, rồi thứ tự của
+    keyset pagination khi request được phân trang. Với `kwargs` (detail view),
+    là queryset mà `get_object()` tra theo lookup.
+    """
+    view = view_class()
+    view.setup(_factory.get(f'/?{query}'), **kwargs)
+    view.request = view.initialize_request(view.request)
+    view.format_kwarg = None
+
+    queryset = view.filter_queryset(view.get_queryset())
+    if kwargs:
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        # get_object() uses .get(), which drops the ordering
+        return queryset.filter(**{view.lookup_field: kwargs[lookup_url_kwarg]}).order_by()
+    paginator = view.paginator
+    if isinstance(paginator, KeysetPagination) and paginator.is_enabled(view.request):
+        queryset = queryset.order_by(*paginator.get_ordering(view.request, queryset, view))
+    return queryset
+
+
+def prefetch_queryset(queryset, pks):
+    """Truy vấn mà `prefetch_related` đầu tiên của `queryset` chạy cho các dòng `pks`"""
+    lookup = queryset._prefetch_related_lookups[0]
+    if isinstance(lookup, Prefetch):
+        name, related = lookup.prefetch_through, lookup.queryset
+    else:
+        name, related = lookup, None
+    relation = queryset.model._meta.get_field(name)
+    if related is None:
+        related = relation.related_model._default_manager.all()
+    return related.filter(**{f'{relation.field.name}__in': pks})
+
+
+def _first_category():
+    return Category.objects.order_by().values_list('pk', flat=True).first()
+
+
+def _category_filter():
+    # The category filter only accepts an existing category; an empty catalog
+    # is planned without it.
+    pk = _first_category()
+    return f'category={pk}' if pk is not None else ''
+
+
+def _last_week():
+    today = timezone.localdate()
+    return f'created_after={today - timedelta(days=7)}&created_before={today}'
+
+
+PLANNED_QUERIES = [
+    # products/views.py
+    PlannedQuery('ProductListView', lambda: view_queryset(ProductListView), True),
+    PlannedQuery('ProductListView ?category=', lambda: view_queryset(ProductListView, _category_filter()), True),
+    PlannedQuery('ProductDetailView', lambda: view_queryset(ProductDetailView, pk=1), True),
+    PlannedQuery('FeaturedProductsView', lambda: view_queryset(FeaturedProductsView), True),
+    PlannedQuery('CategoryListView', lambda: view_queryset(CategoryListView), False),
+    PlannedQuery('BannerListView', lambda: view_queryset(BannerListView), False),
+    # orders/views.py
+    PlannedQuery('OrderListView', lambda: view_queryset(OrderListView), True),
+    PlannedQuery('OrderListView ?status=', lambda: view_queryset(OrderListView, 'status=pending'), True),
+    PlannedQuery(
+        'OrderListView ?search=<phone>', lambda: view_queryset(OrderListView, 'search=0901'), False,
+    ),
+    PlannedQuery(
+        'OrderListView ?created_after=&created_before=',
+        lambda: view_queryset(OrderListView, _last_week()), True,
+    ),
+    # The prefetch query of the items of one page
+    PlannedQuery('OrderListView items', lambda: prefetch_queryset(view_queryset(OrderListView), [1, 2, 3]), True),
+    PlannedQuery(
+        'OrderListView ?items=compact items',
+        lambda: prefetch_queryset(view_queryset(OrderListView, 'items=compact'), [1, 2, 3]), True,
+    ),
+    PlannedQuery('OrderDetailView', lambda: view_queryset(OrderDetailView, pk=1), True),
+    PlannedQuery(
+        'OrderSyncView',
+        lambda: sync.after(view_queryset(OrderSyncView), 'updated_at', timezone.now(), 1).order_by('updated_at', 'id'),
+        True,
+    ),
+    PlannedQuery(
+        'OrderSyncView tombstones',
+        lambda: sync.after(OrderTombstone.objects.all(), 'deleted_at', timezone.now(), 1)
+        .order_by('deleted_at', 'id'), True,
+    ),
+    PlannedQuery(
+        'KitchenQueueView (open orders)',
+        lambda: kitchen.with_item_counts(Order.objects.filter(status__in=kitchen.OPEN_STATUSES).order_by()), True,
+    ),
+    PlannedQuery(
+        'KitchenQueueView (recent timings)',
+        lambda: kitchen.with_item_counts(
+            Order.objects.filter(ready_at__isnull=False, preparing_at__isnull=False).order_by('-ready_at')
+        )[:kitchen.DEFAULT_THROUGHPUT_SAMPLE], True,
+    ),
+    PlannedQuery(
+        'refresh_sales_rollups (changed orders)',
+        lambda: Order.objects.filter(
+            updated_at__gt=timezone.now() - timedelta(minutes=5), updated_at__lte=timezone.now(),
+        ).order_by(), True,
+    ),
+    PlannedQuery(
+        'refresh_sales_rollups (order items)',
+        lambda: rollups.sold_items(timezone.now() - timedelta(hours=1), timezone.now()), True,
+    ),
+    # Grouping the rollup rows of the requested dates needs a sort
+    PlannedQuery(
+        'SalesReportView',
+        lambda: DailySales.objects.filter(day__gte=date(2026, 1, 1), day__lte=date(2026, 1, 31))
+        .values('day', 'category_name').annotate(quantity_sum=Sum('quantity')).order_by('day', 'category_name'),
+        False,
+    ),
+    PlannedQuery(
+        'dashboard_stats (today)',
+        lambda: dashboard.orders_of_day(dashboard.today_start()).order_by(), True,
+    ),
+    PlannedQuery('update_hot_products (window)', lambda: hot_products.recent_items(timezone.now()), True),
+    PlannedQuery(
+        'CreateOrderView Idempotency-Key', lambda: IdempotencyKey.objects.filter(key_hash='0' * 32), True,
+    ),
+    # frontend/views.py
+    PlannedQuery('home (products)', lambda: Storefront().product_queryset(), True),
+    PlannedQuery('home (products) ?category=', lambda: Storefront(_first_category()).product_queryset(), True),
+    PlannedQuery('home (categories)', lambda: Storefront().category_queryset(), False),
+    # get() drops the ordering
+    PlannedQuery('track_order', lambda: tracked_order(1).order_by(), True),
+    PlannedQuery('track_order items', lambda: prefetch_queryset(tracked_order(1), [1]), True),
+]
+
+
+def find_problems(plan):
+    problems = []
+    for line in plan.splitlines():
+        for pattern, kind in PLAN_PATTERNS:
+            if pattern.search(line.strip()):
+                problems.append(Problem(kind, line.strip()))
+    return problems
+
+
+def _top_level_lookups(queryset):
+    table = queryset.model._meta.db_table
+    for child in queryset.query.where.children:
+        lhs = getattr(child, 'lhs', None)
+        if getattr(lhs, 'alias', None) == table and hasattr(lhs, 'target'):
+            yield child, lhs.target.name
+
+
+def suggest_index(queryset):
+    """Index đề xuất cho queryset (None nếu không có cột nào để đánh index)"""
+    fields = []
+    ranges = []
+    condition = {}
+    for lookup, name in _top_level_lookups(queryset):
+        if isinstance(lookup, Exact) and isinstance(lookup.rhs, bool):
+            # Compiled to a bare `WHERE flag` / `WHERE NOT flag` on SQLite, which
+            # only a partial index with the same condition can serve.
+            condition[name] = lookup.rhs
+        elif isinstance(lookup, Exact):
+            fields.append(name)
+        else:
+            ranges.append(name)
+
+    ordering = [
+        field.replace('pk', 'id') if field.lstrip('-') == 'pk' else field
+        for field in (queryset.query.order_by or queryset.model._meta.ordering)
+        if isinstance(field, str) and field != '?'
+    ]
+    # One range column can follow the equality columns; the ordering can still
+    # come from the index only when it starts with that same column.
+    if ranges and (not ordering or ordering[0].lstrip('-') != ranges[0]):
+        fields.append(ranges[0])
+    else:
+        fields.extend(ordering)
+
+    fields = list(dict.fromkeys(fields))
+    if not fields:
+        return None
+    # Named as if the condition columns were indexed too, so that partial and
+    # full indexes on the same columns get different names.
+    index = models.Index(fields=fields + list(condition))
+    index.set_name_with_model(queryset.model)
+    if condition:
+        index = models.Index(fields=fields, condition=Q(**condition), name=index.name)
+    return index
+
+
+def _has_index(model, index):
+    return any(
+        (existing.fields, existing.condition) == (index.fields, index.condition)
+        for existing in model._meta.indexes
+    )
+
+
+PlanReport = namedtuple('PlanReport', ['query', 'model', 'plan', 'problems', 'suggestion'])
+
+
+def inspect(queries=None):
+    """Một `PlanReport` cho mỗi truy vấn trong `queries` (mặc định `PLANNED_QUERIES`)"""
+    reports = []
+    for query in queries or PLANNED_QUERIES:
+        queryset = query.build()
+        plan = queryset.explain()
+        problems = find_problems(plan)
+        suggestion = None
+        if problems and query.hot:
+            suggestion = suggest_index(queryset)
+            if suggestion is not None and _has_index(queryset.model, suggestion):
+                suggestion = None
+        reports.append(PlanReport(query, queryset.model, plan, problems, suggestion))
+    return reports
+
+
+def suggested_migrations(reports):
+    """`MigrationWriter` cho mỗi app có index được đề xuất, nối tiếp migration mới nhất"""
+    operations = {}
+    for report in reports:
+        if report.suggestion is None:
+            continue
+        meta = report.model._meta
+        app_operations = operations.setdefault(meta.app_label, {})
+        app_operations.setdefault(
+            tuple(report.suggestion.fields),
+            migrations.AddIndex(model_name=meta.model_name, index=report.suggestion),
+        )
+
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    writers = []
+    for app_label, app_operations in operations.items():
+        leaves = loader.graph.leaf_nodes(app_label)
+        number = max((MigrationAutodetector.parse_number(name) or 0 for _, name in leaves), default=0) + 1
+        migration = migrations.Migration(f'{number:04d}_index_advisor', app_label)
+        migration.dependencies = leaves
+        migration.operations = list(app_operations.values())
+        writers.append(MigrationWriter(migration))
+    return writers
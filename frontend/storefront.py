@@ -0,0 +1,78 @@
+"""
+Trang chủ render phía server.
+
+`Storefront` cung cấp dữ liệu cho lưới sản phẩm và banner của `home.html`.
+Các thuộc tính chỉ truy vấn database khi được đọc, nên khi fragment
+`{% cache %}` tương ứng còn trong cache thì không tốn truy vấn nào ngoài
+`version`. Khóa cache chứa `catalog_fingerprint()`, nên mọi thay đổi sản
+phẩm/danh mục/banner đều làm fragment cũ hết hiệu lực.
+"""
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from products.catalog import catalog_fingerprint
+from products.models import Banner, Category, Product
+from products.projections import ProductProjection
+from products.serializers import BannerSerializer
+
+
+DEFAULT_PAGE_SIZE = 24
+
+SIZE_DISPLAY = dict(Product.SIZE_CHOICES)
+
+
+def _positive_int(value, default=None):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return default
+    return number if number > 0 else default
+
+
+class Storefront:
+    """Dữ liệu trang chủ cho một danh mục và một trang"""
+
+    def __init__(self, category=None, page=None):
+        self.category_id = _positive_int(category)
+        self.page_number = _positive_int(page, 1)
+
+    @cached_property
+    def version(self):
+        return catalog_fingerprint()
+
+    @property
+    def cache_key(self):
+        """Các giá trị `vary_on` của fragment lưới sản phẩm"""
+        return [self.version, self.category_id or 'all', self.page_number]
+
+    def category_queryset(self):
+        """Các danh mục có sản phẩm để hiển thị trong bộ lọc"""
+        return Category.objects.filter(is_active=True, available_product_count__gt=0)
+
+    def product_queryset(self):
+        """Sản phẩm của lưới, theo danh mục đang chọn, mới nhất trước"""
+        queryset = Product.objects.filter(is_available=True).order_by('-created_at', 'id')
+        if self.category_id:
+            queryset = queryset.filter(category_id=self.category_id)
+        return queryset
+
+    @cached_property
+    def categories(self):
+        return list(self.category_queryset().values('id', 'name'))
+
+    @cached_property
+    def product_page(self):
+        queryset = self.product_queryset()
+        projection = ProductProjection()
+        page_size = getattr(settings, 'STOREFRONT_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+        page = Paginator(projection.values(queryset), page_size).get_page(self.page_number)
+        page.object_list = projection.serialize(page.object_list)
+        for product in page.object_list:
+            product['get_size_display'] = SIZE_DISPLAY.get(product['size'], product['size'])
+        return page
+
+    @cached_property
+    def banners(self):
+        queryset = Banner.objects.filter(is_active=True).order_by('order', '-created_at')
+        return BannerSerializer(queryset, many=True).data
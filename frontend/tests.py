@@ -1,3 +1,29 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from orders.views import OrderListView
+from products.views import ProductListView
+
+from .query_plans import prefetch_queryset, view_queryset
+
+
+class QueryPlanTests(TestCase):
+    def test_planned_queries_come_from_the_views(self):
+        orders = view_queryset(OrderListView, 'status=pending')
+        self.assertIn('"orders_order"."status" = pending', str(orders.query))
+        self.assertEqual(orders.query.order_by, ('-created_at', 'id'))
+        self.assertEqual(view_queryset(ProductListView).query.order_by, ('-created_at', 'id'))
+        self.assertEqual(view_queryset(ProductListView, 'ordering=price').query.order_by, ('price',))
+
+    def test_prefetch_queries_come_from_the_querysets(self):
+        items = prefetch_queryset(view_queryset(OrderListView), [1, 2])
+        self.assertIn('"orders_orderitem"."order_id" IN (1, 2)', str(items.query))
+        # The view's Prefetch joins the catalog; the compact items do not
+        self.assertIn('products_category', str(items.query))
+        compact = prefetch_queryset(view_queryset(OrderListView, 'items=compact'), [1, 2])
+        self.assertNotIn('products_product', str(compact.query))
+
+    def test_hot_queries_use_indexes(self):
+        call_command('index_advisor', '--check', stdout=StringIO())
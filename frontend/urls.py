@@ -19,6 +19,7 @@ urlpatterns = [
     path('admin-panel/products/', views.admin_products, name='admin-products'),
     path('admin-panel/categories/', admin_categories, name='admin-categories'),
     path('admin-panel/orders/', views.admin_orders, name='admin-orders'),
+    path('admin-panel/kitchen/', views.admin_kitchen, name='admin-kitchen'),
     path('admin-panel/banners/', views.admin_banners, name='admin-banners'),
     
     # Admin API endpoints
@@ -1,19 +1,32 @@
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from products.models import Product, Category, Banner
 from products.serializers import ProductSerializer, BannerSerializer
+from orders import kitchen
+from orders.models import Order
+from orders.transitions import TRANSITIONS
+from trasua_project.query_budget import query_budget
+from .storefront import Storefront
 from .banner_views import admin_banners, create_banner, update_banner, delete_banner
 import json
+import math
 
 
+@query_budget(7)
 def home(request):
     """Trang chủ - hiển thị sản phẩm và banner"""
-    return render(request, 'frontend/home.html')
+    context = {}
+    if getattr(settings, 'STOREFRONT_SERVER_RENDERING', False):
+        context['storefront'] = Storefront(request.GET.get('category'), request.GET.get('page'))
+        context['fragment_ttl'] = getattr(settings, 'STOREFRONT_FRAGMENT_TTL', 300)
+    return render(request, 'frontend/home.html', context)
 
 
 def cart(request):
@@ -31,21 +44,32 @@ def order_success(request):
     return render(request, 'frontend/order_success.html')
 
 
+def tracked_order(order_id):
+    """Đơn hàng (kèm các dòng) mà trang tra cứu hiển thị"""
+    return Order.objects.prefetch_related('items').filter(id=order_id)
+
+
 def track_order(request):
     """Trang tra cứu đơn hàng"""
     order = None
+    queue_entry = None
     order_id = request.GET.get('order_id')
     
     if order_id:
         try:
-            from orders.models import Order
-            order = Order.objects.get(id=order_id)
+            order = tracked_order(order_id).get()
         except Order.DoesNotExist:
             order = None
     
+    if order is not None and order.status in kitchen.OPEN_STATUSES:
+        queue_entry = kitchen.queue.entry(order.id)
+    
     return render(request, 'frontend/track_order.html', {
         'order': order,
-        'order_id': order_id
+        'order_id': order_id,
+        'queue_entry': queue_entry,
+        # Whole minutes left, rounded up; 0 once the estimate has passed
+        'ready_in': max(math.ceil((queue_entry.eta - timezone.now()).total_seconds() / 60), 0) if queue_entry else None,
     })
 
 
@@ -103,7 +127,15 @@ def admin_orders(request):
     """Trang quản lý đơn hàng"""
     if not request.user.is_staff:
         return redirect('admin-login')
-    return render(request, 'frontend/admin/orders.html')
+    order_transitions = {status: sorted(targets) for status, targets in TRANSITIONS.items()}
+    return render(request, 'frontend/admin/orders.html', {'order_transitions': order_transitions})
+
+
+def admin_kitchen(request):
+    """Màn hình bếp: hàng đợi pha chế"""
+    if not request.user.is_staff:
+        return redirect('admin-login')
+    return render(request, 'frontend/admin/kitchen.html')
 
 
 @csrf_exempt
@@ -5,8 +5,8 @@ from .models import Order, OrderItem
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
-    readonly_fields = ['total_price', 'formatted_price', 'formatted_total']
-    fields = ['product', 'quantity', 'price', 'total_price']
+    readonly_fields = ['product_name', 'product_size', 'total_price', 'formatted_price', 'formatted_total']
+    fields = ['product', 'product_name', 'product_size', 'quantity', 'price', 'total_price']
 
 
 @admin.register(Order)
@@ -15,7 +15,7 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ['status', 'payment_method', 'payment_status', 'created_at']
     search_fields = ['customer_name', 'customer_phone', 'customer_email']
     list_editable = ['status']
-    readonly_fields = ['created_at', 'updated_at', 'formatted_total']
+    readonly_fields = ['created_at', 'updated_at', 'preparing_at', 'ready_at', 'formatted_total']
     inlines = [OrderItemInline]
     
     fieldsets = (
@@ -26,7 +26,7 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': ('status', 'payment_method', 'payment_status', 'total_amount', 'notes')
         }),
         ('Thông tin xử lý', {
-            'fields': ('processed_by', 'created_at', 'updated_at')
+            'fields': ('processed_by', 'created_at', 'updated_at', 'preparing_at', 'ready_at')
         }),
     )
 
@@ -38,7 +38,7 @@ class OrderAdmin(admin.ModelAdmin):
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
-    list_display = ['order', 'product', 'quantity', 'price', 'total_price']
-    list_filter = ['order__status', 'product__category']
-    search_fields = ['order__customer_name', 'product__name']
+    list_display = ['order', 'product_name', 'product_size', 'quantity', 'price', 'total_price']
+    list_filter = ['order__status', 'category_name']
+    search_fields = ['order__customer_name', 'product_name']
     readonly_fields = ['total_price', 'formatted_price', 'formatted_total']
\ No newline at end of file
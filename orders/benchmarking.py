@@ -0,0 +1,38 @@
+"""Dữ liệu đơn hàng giả cho các lệnh benchmark."""
+import random
+
+from .models import Order, OrderItem
+
+
+STATUSES = [code for code, _ in Order.STATUS_CHOICES]
+PAYMENT_METHODS = [code for code, _ in Order.PAYMENT_CHOICES]
+
+
+def seed_orders(count, products, items_per_order=3, seed=0):
+    """Tạo `count` đơn hàng giả với các sản phẩm trong `products` (bulk_create, không gửi signal)"""
+    rng = random.Random(seed)
+    products = list(products)
+    orders = Order.objects.bulk_create([
+        Order(
+            customer_name=f'Khách hàng {index}',
+            customer_phone=f'09{index:08d}',
+            customer_address=f'{index} Đường Lê Lợi, Quận 1, TP. Hồ Chí Minh',
+            status=rng.choice(STATUSES),
+            payment_method=rng.choice(PAYMENT_METHODS),
+            total_amount=0,
+            notes='Ít đá, nhiều trân châu' if index % 3 == 0 else '',
+        )
+        for index in range(count)
+    ], batch_size=500)
+
+    items = []
+    for order in orders:
+        total = 0
+        for product in rng.sample(products, min(items_per_order, len(products))):
+            quantity = rng.randint(1, 3)
+            items.append(OrderItem.for_product(product, quantity, order=order))
+            total += quantity * product.price
+        order.total_amount = total
+    OrderItem.objects.bulk_create(items, batch_size=500)
+    Order.objects.bulk_update(orders, ['total_amount'], batch_size=500)
+    return Order.objects.filter(pk__in=[order.pk for order in orders])
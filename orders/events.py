@@ -0,0 +1,156 @@
+"""
+Luồng sự kiện đơn hàng cho trang quản lý đơn (`/api/orders/events/`).
+
+Signal của đơn hàng đẩy sự kiện (`order.created`, `order.status_changed`) vào
+một hàng đợi trong bộ nhớ của process; mỗi client đang kết nối chỉ chờ trên
+`threading.Condition` của hàng đợi đó, không truy vấn database. Cursor có dạng
+`<boot id>-<số thứ tự>`: client gửi lại cursor cuối cùng (header
+`Last-Event-ID` của SSE hoặc `?cursor=`) để nhận tiếp các sự kiện đã lỡ. Cursor
+của process khác/lần khởi động khác, hoặc đã bị đẩy ra khỏi hàng đợi, trả về
+sự kiện `reset`: client tải lại danh sách đơn hàng.
+
+Hàng đợi nằm trong một process, nên chỉ phù hợp khi chạy một process
+(`runserver`, hoặc một worker nhiều thread).
+"""
+import json
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Order
+from .serializers import CompactOrderSerializer
+
+
+DEFAULT_BACKLOG = 1000
+DEFAULT_LONG_POLL_TIMEOUT = 25
+DEFAULT_STREAM_DURATION = 300
+HEARTBEAT_INTERVAL = 15
+RETRY_MS = 3000
+
+ORDER_CREATED = 'order.created'
+ORDER_STATUS_CHANGED = 'order.status_changed'
+# First frame of a new connection, carrying its starting cursor
+READY = 'ready'
+# The cursor could not be resumed: reload the order list
+RESET = 'reset'
+
+Event = namedtuple('Event', ['seq', 'type', 'data'])
+
+
+class EventBus:
+    """Hàng đợi sự kiện có giới hạn, các thread chờ sự kiện mới bằng Condition"""
+
+    def __init__(self, backlog=DEFAULT_BACKLOG):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=backlog)
+        self._seq = 0
+        self._condition = threading.Condition()
+
+    @property
+    def head(self):
+        return self._seq
+
+    def cursor(self, seq):
+        return f'{self.boot_id}-{seq}'
+
+    def parse_cursor(self, cursor):
+        """Số thứ tự trong cursor; None nếu cursor không thuộc process này"""
+        boot_id, _, seq = (cursor or '').partition('-')
+        if boot_id != self.boot_id or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        return int(seq)
+
+    def publish(self, type, data):
+        with self._condition:
+            self._seq += 1
+            self._events.append(Event(self._seq, type, data))
+            self._condition.notify_all()
+
+    def read(self, seq):
+        """(các sự kiện sau `seq`, False nếu một số sự kiện đã bị đẩy ra khỏi hàng đợi)"""
+        with self._condition:
+            if self._events and self._events[0].seq > seq + 1:
+                return [], False
+            return [event for event in self._events if event.seq > seq], True
+
+    def wait(self, seq, timeout):
+        """Chờ tối đa `timeout` giây cho tới khi có sự kiện sau `seq`, rồi `read(seq)`"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > seq, timeout)
+        return self.read(seq)
+
+
+bus = EventBus(getattr(settings, 'ORDER_EVENTS_BACKLOG', DEFAULT_BACKLOG))
+
+
+def publish_created(order):
+    bus.publish(ORDER_CREATED, {'order': CompactOrderSerializer(order).data})
+
+
+def publish_status_changed(order_id, status, updated_at):
+    bus.publish(ORDER_STATUS_CHANGED, {
+        'id': order_id,
+        'status': status,
+        'status_display': dict(Order.STATUS_CHOICES)[status],
+        'updated_at': updated_at,
+    })
+
+
+def encode(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def long_poll(cursor, timeout):
+    """Body JSON của một lần long-poll; không có cursor thì chỉ trả về cursor hiện tại"""
+    seq = bus.parse_cursor(cursor)
+    if seq is None:
+        return {'cursor': bus.cursor(bus.head), 'events': [], 'reset': bool(cursor)}
+    events, complete = bus.wait(seq, timeout)
+    if not complete:
+        return {'cursor': bus.cursor(bus.head), 'events': [], 'reset': True}
+    return {
+        'cursor': bus.cursor(events[-1].seq if events else seq),
+        'events': [
+            {'id': bus.cursor(event.seq), 'type': event.type, 'data': event.data} for event in events
+        ],
+        'reset': False,
+    }
+
+
+def _sse(type, data, seq=None):
+    lines = []
+    if seq is not None:
+        lines.append(f'id: {bus.cursor(seq)}')
+    lines.append(f'event: {type}')
+    lines.append(f'data: {encode(data)}')
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+def event_stream(cursor, duration):
+    """
+    Các khung Server-Sent Events từ sau `cursor`; kết thúc sau `duration` giây,
+    trình duyệt tự kết nối lại với `Last-Event-ID`.
+    """
+    yield f'retry: {RETRY_MS}\n\n'.encode()
+    seq = bus.parse_cursor(cursor)
+    if seq is None:
+        seq = bus.head
+        yield _sse(RESET if cursor else READY, {}, seq)
+
+    deadline = time.monotonic() + duration
+    while (remaining := deadline - time.monotonic()) > 0:
+        events, complete = bus.wait(seq, min(HEARTBEAT_INTERVAL, remaining))
+        if not complete:
+            seq = bus.head
+            yield _sse(RESET, {}, seq)
+            continue
+        if not events:
+            yield b': ping\n\n'
+            continue
+        for event in events:
+            yield _sse(event.type, event.data, event.seq)
+        seq = events[-1].seq
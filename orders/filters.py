@@ -0,0 +1,32 @@
+import django_filters
+
+from .models import Order
+from .phones import looks_like_phone, normalize_phone_prefix
+
+
+class OrderFilter(django_filters.FilterSet):
+    """
+    Lọc danh sách đơn hàng: `status`, `payment_method`, `payment_status`,
+    `created_after` / `created_before` (ngày, tính cả hai đầu) và `search`
+    (số điện thoại hoặc tên khách hàng).
+    """
+    status = django_filters.MultipleChoiceFilter(choices=Order.STATUS_CHOICES)
+    payment_method = django_filters.ChoiceFilter(choices=Order.PAYMENT_CHOICES)
+    payment_status = django_filters.BooleanFilter()
+    created = django_filters.DateFromToRangeFilter(field_name='created_at')
+    search = django_filters.CharFilter(method='filter_search')
+
+    class Meta:
+        model = Order
+        fields = ['status', 'payment_method', 'payment_status', 'created']
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        if looks_like_phone(value):
+            phone = normalize_phone_prefix(value)
+            # Prefix match as a range on the customer_phone index: phones are
+            # digits only, and ':' sorts right after '9'.
+            return queryset.filter(customer_phone__gte=phone, customer_phone__lt=phone + ':')
+        return queryset.filter(customer_name__icontains=value)
@@ -0,0 +1,216 @@
+"""
+Tự động gắn trạng thái 'hot' cho các sản phẩm bán chạy.
+
+Số ly bán được của từng sản phẩm trong `HOT_PRODUCTS_WINDOW` giây gần nhất
+được đếm trong bộ nhớ: mỗi sản phẩm có một vòng đệm (ring buffer) các ô
+`HOT_PRODUCTS_BUCKET` giây, ô cũ nhất được xóa khi cửa sổ trượt qua. Bộ đếm
+đọc các đơn trong cửa sổ từ database ở lần dùng đầu tiên, sau đó mỗi đơn mới
+cộng các dòng của nó vào khi transaction commit.
+
+Tối đa mỗi `HOT_PRODUCTS_INTERVAL` giây, một thread nền xếp hạng lại:
+`HOT_PRODUCTS_TOP_N` sản phẩm đầu (bán ít nhất `HOT_PRODUCTS_MIN_QUANTITY`
+ly) được gắn 'hot'; sản phẩm đang 'hot' chỉ mất trạng thái khi rơi khỏi top
+`HOT_PRODUCTS_TOP_N + HOT_PRODUCTS_MARGIN`, để trạng thái không nhấp nháy khi
+thứ hạng dao động. Thay đổi được ghi bằng tối đa hai câu UPDATE có điều kiện,
+chỉ đổi '' ↔ 'hot' (không đụng 'sale'/'sold_out'), kèm `updated_at`, nên
+`catalog_fingerprint()` đổi: cache trang chủ, bootstrap và ETag của API sản
+phẩm đều hết hạn.
+
+Giống orders/events.py, bộ đếm nằm trong một process; khi chạy nhiều process,
+dùng lệnh `update_hot_products` định kỳ (đọc lại cửa sổ từ database).
+"""
+import logging
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from products.models import Product
+
+from .models import OrderItem
+
+
+logger = logging.getLogger('trasua.hot_products')
+
+DEFAULT_WINDOW = 2 * 60 * 60
+DEFAULT_BUCKET = 5 * 60
+DEFAULT_TOP_N = 5
+DEFAULT_MARGIN = 3
+DEFAULT_MIN_QUANTITY = 3
+DEFAULT_INTERVAL = 60
+
+HOT = 'hot'
+# Statuses the ranking may replace; 'sale' and 'sold_out' are set by hand
+AUTOMATIC_STATUSES = ('', HOT)
+
+
+def _setting(name, default):
+    return getattr(settings, f'HOT_PRODUCTS_{name}', default)
+
+
+class VelocityCounter:
+    """Số lượng bán của từng sản phẩm trong một cửa sổ trượt, chia thành các ô thời gian"""
+
+    def __init__(self, window, bucket):
+        self.bucket_seconds = bucket
+        self.size = -(-window // bucket)
+        self.loaded = False
+        self._lock = threading.Lock()
+        # product id -> per-bucket quantities, indexed by bucket number % size
+        self._rings = {}
+        self._totals = {}
+        self._bucket = None
+
+    def bucket_of(self, moment):
+        return int(moment.timestamp()) // self.bucket_seconds
+
+    def _advance(self, bucket):
+        if self._bucket is not None and bucket - self._bucket >= self.size:
+            self._rings.clear()
+            self._totals.clear()
+        elif self._bucket is not None and bucket > self._bucket:
+            expired = [number % self.size for number in range(self._bucket + 1, bucket + 1)]
+            for product_id, ring in list(self._rings.items()):
+                for slot in expired:
+                    self._totals[product_id] -= ring[slot]
+                    ring[slot] = 0
+                if not self._totals[product_id]:
+                    del self._rings[product_id], self._totals[product_id]
+        if self._bucket is None or bucket > self._bucket:
+            self._bucket = bucket
+
+    def _add(self, product_id, quantity, bucket):
+        self._advance(bucket)
+        if bucket <= self._bucket - self.size:
+            return
+        ring = self._rings.get(product_id)
+        if ring is None:
+            ring = self._rings[product_id] = array('I', bytes(4 * self.size))
+            self._totals[product_id] = 0
+        ring[bucket % self.size] += quantity
+        self._totals[product_id] += quantity
+
+    def add(self, items, moment):
+        """Cộng các cặp `(product id, số lượng)` bán lúc `moment`"""
+        bucket = self.bucket_of(moment)
+        with self._lock:
+            for product_id, quantity in items:
+                self._add(product_id, quantity, bucket)
+
+    def load(self, rows, now):
+        """Thay toàn bộ bộ đếm bằng các dòng `(product id, thời điểm, số lượng)`"""
+        with self._lock:
+            self._rings.clear()
+            self._totals.clear()
+            self._bucket = self.bucket_of(now)
+            for product_id, moment, quantity in rows:
+                self._add(product_id, quantity, self.bucket_of(moment))
+            self.loaded = True
+
+    def totals(self, now):
+        """{product id: số lượng bán trong cửa sổ kết thúc lúc `now`}"""
+        with self._lock:
+            self._advance(self.bucket_of(now))
+            return dict(self._totals)
+
+
+counter = VelocityCounter(_setting('WINDOW', DEFAULT_WINDOW), _setting('BUCKET', DEFAULT_BUCKET))
+
+_executor = None
+_schedule_lock = threading.Lock()
+_next_run = 0.0
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='hot-products')
+    return _executor
+
+
+def recent_items(now):
+    """`(product id, giờ đặt, số lượng)` của các dòng đơn hàng trong cửa sổ"""
+    start = now - timedelta(seconds=_setting('WINDOW', DEFAULT_WINDOW))
+    return (
+        OrderItem.objects.filter(order__created_at__gte=start, product__isnull=False)
+        .order_by().values_list('product_id', 'order__created_at', 'quantity')
+    )
+
+
+def choose_hot(totals, statuses, current):
+    """
+    Tập sản phẩm nên 'hot': `totals` là số lượng bán trong cửa sổ, `statuses`
+    là {id: status} của các sản phẩm còn bán, `current` là các sản phẩm đang 'hot'
+    """
+    top_n = _setting('TOP_N', DEFAULT_TOP_N)
+    margin = _setting('MARGIN', DEFAULT_MARGIN)
+    ranking = [
+        product_id
+        for product_id in sorted(totals, key=lambda product_id: (-totals[product_id], product_id))
+        if statuses.get(product_id) in AUTOMATIC_STATUSES
+        and totals[product_id] >= _setting('MIN_QUANTITY', DEFAULT_MIN_QUANTITY)
+    ]
+    # Entering takes a top-N rank; leaving takes falling below N + margin.
+    return set(ranking[:top_n]) | (set(ranking[:top_n + margin]) & current)
+
+
+def update_hot_products(now=None):
+    """Xếp hạng lại và ghi trạng thái 'hot'; trả về `(id được gắn, id bị bỏ)`"""
+    now = now or timezone.now()
+    if not counter.loaded:
+        counter.load(recent_items(now).iterator(), now)
+    totals = counter.totals(now)
+
+    rows = list(Product.objects.filter(Q(pk__in=totals) | Q(status=HOT)).values_list('id', 'status', 'is_available'))
+    statuses = {product_id: status for product_id, status, is_available in rows if is_available}
+    current = {product_id for product_id, status, _ in rows if status == HOT}
+    hot = choose_hot(totals, statuses, current)
+    promoted, demoted = hot - current, current - hot
+    with transaction.atomic():
+        if promoted:
+            Product.objects.filter(pk__in=promoted, status='').update(status=HOT, updated_at=now)
+        if demoted:
+            Product.objects.filter(pk__in=demoted, status=HOT).update(status='', updated_at=now)
+    return promoted, demoted
+
+
+def _run_in_worker():
+    close_old_connections()
+    try:
+        update_hot_products()
+    except Exception:
+        logger.exception('Không cập nhật được sản phẩm hot')
+    finally:
+        connection.close()
+
+
+def schedule_update():
+    """Chạy `update_hot_products()` ở thread nền, tối đa một lần mỗi `HOT_PRODUCTS_INTERVAL` giây"""
+    global _next_run
+    with _schedule_lock:
+        now = time.monotonic()
+        if now < _next_run:
+            return
+        _next_run = now + _setting('INTERVAL', DEFAULT_INTERVAL)
+    get_executor().submit(_run_in_worker)
+
+
+def record_order(order):
+    """Cộng các dòng của một đơn mới vào bộ đếm (gọi sau khi transaction commit)"""
+    if not _setting('AUTO', True):
+        return
+    if counter.loaded:
+        # Items are in memory already: CreateOrderSerializer.create() and
+        # intake.create_orders() cache them on the order before commit.
+        counter.add(
+            [(item.product_id, item.quantity) for item in order.items.all() if item.product_id],
+            order.created_at,
+        )
+    # Otherwise the first update loads the window, this order included.
+    schedule_update()
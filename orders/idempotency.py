@@ -0,0 +1,113 @@
+"""
+Idempotency cho `POST /api/orders/create/`.
+
+Client gửi header `Idempotency-Key` (ví dụ một UUID) và dùng lại đúng khóa đó
+khi thử lại. Response đầu tiên được lưu vào `IdempotencyKey` trong cùng
+transaction với đơn hàng; các lần thử lại được trả lại response đó mà không
+đọc/ghi bảng đơn hàng. Hai yêu cầu trùng khóa chạy đồng thời va vào ràng
+buộc unique: yêu cầu thua rollback đơn hàng của mình và trả về kết quả của
+yêu cầu thắng. Khóa hết hạn sau `IDEMPOTENCY_KEY_TTL` giây.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL = 24 * 60 * 60
+
+# Single and bulk order creation share one key space.
+ORDER_CREATE_SCOPE = 'orders.create'
+
+
+class IdempotencyKeyError(Exception):
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()[:32]
+
+
+def key_hash(scope, key):
+    return _digest(f'{scope}:{key}')
+
+
+def request_hash(data):
+    return _digest(json.dumps(data, sort_keys=True, separators=(',', ':'), default=str))
+
+
+def expiry_cutoff():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', DEFAULT_TTL))
+
+
+def purge_expired():
+    """Xóa các khóa đã hết hạn; trả về số dòng đã xóa"""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expiry_cutoff()).delete()
+    return deleted
+
+
+def replay(record, fingerprint):
+    if record.request_hash != fingerprint:
+        raise IdempotencyKeyError(
+            f'{HEADER} đã được dùng cho một yêu cầu khác.', status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def find_record(digest):
+    """Bản ghi còn hạn của khóa; bản ghi đã hết hạn được xóa để khóa dùng lại được"""
+    record = IdempotencyKey.objects.filter(key_hash=digest).first()
+    if record is not None and record.created_at < expiry_cutoff():
+        record.delete()
+        return None
+    return record
+
+
+def idempotent(scope, request, handler):
+    """
+    Chạy `handler()` (trả về `(Response, order)`) đúng một lần cho mỗi
+    `Idempotency-Key`; không có header thì chạy bình thường.
+    """
+    key = request.headers.get(HEADER)
+    if key is None:
+        return handler()[0]
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyKeyError(f'{HEADER} phải dài từ 1 đến {MAX_KEY_LENGTH} ký tự.')
+
+    digest = key_hash(scope, key)
+    fingerprint = request_hash(request.data)
+    record = find_record(digest)
+    if record is not None:
+        return replay(record, fingerprint)
+
+    try:
+        with transaction.atomic():
+            response, order = handler()
+            if not status.is_success(response.status_code):
+                return response
+            IdempotencyKey.objects.create(
+                key_hash=digest,
+                request_hash=fingerprint,
+                order=order,
+                status_code=response.status_code,
+                response=response.data,
+            )
+    except IntegrityError:
+        # A concurrent request with the same key committed first; our order
+        # was rolled back together with the failed INSERT.
+        record = IdempotencyKey.objects.filter(key_hash=digest).first()
+        if record is None:
+            raise
+        return replay(record, fingerprint)
+    return response
@@ -0,0 +1,144 @@
+"""
+Nhận đơn hàng theo lô (máy POS/kiosk gửi lại các đơn đã lưu tạm khi mất mạng).
+
+Mỗi đơn có cùng định dạng với `CreateOrderSerializer`, thêm field tùy chọn
+`idempotency_key` (cùng ý nghĩa với header `Idempotency-Key` của
+`/api/orders/create/`). Cả lô dùng một truy vấn sản phẩm, một truy vấn khóa
+idempotency, và được ghi trong một transaction bằng `bulk_create`; đơn không
+hợp lệ chỉ bị báo lỗi riêng, không làm hỏng cả lô.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from rest_framework import status
+
+from .idempotency import (
+    HEADER, MAX_KEY_LENGTH, ORDER_CREATE_SCOPE, expiry_cutoff, key_hash, request_hash,
+)
+from .models import IdempotencyKey, Order, OrderItem, OrderStatusCount
+from .serializers import CreateOrderSerializer, OrderSerializer, fetch_products
+from .signals import orders_created
+
+
+MAX_BATCH_SIZE = 100
+KEY_FIELD = 'idempotency_key'
+
+
+def collect_product_ids(payloads):
+    product_ids = set()
+    for payload in payloads:
+        items = payload.get('items') if isinstance(payload, dict) else None
+        for item in items if isinstance(items, list) else ():
+            if isinstance(item, dict):
+                try:
+                    product_ids.add(int(item.get('product_id')))
+                except (TypeError, ValueError):
+                    pass
+    return product_ids
+
+
+def _invalid(index, errors):
+    return {'index': index, 'status': 'invalid', 'errors': errors}
+
+
+def _replayed(index, record, fingerprint):
+    if record['request_hash'] != fingerprint:
+        return _invalid(index, {KEY_FIELD: [f'{HEADER} đã được dùng cho một yêu cầu khác.']})
+    return {'index': index, 'status': 'replayed', 'order': record['response']}
+
+
+def _lookup_keys(digests):
+    """{key_hash: bản ghi còn hạn} trong một truy vấn; xóa các khóa đã hết hạn"""
+    if not digests:
+        return {}
+    cutoff = expiry_cutoff()
+    records = {}
+    expired = []
+    for record in IdempotencyKey.objects.filter(key_hash__in=digests).values(
+        'key_hash', 'request_hash', 'response', 'created_at',
+    ):
+        if record['created_at'] < cutoff:
+            expired.append(record['key_hash'])
+        else:
+            records[record['key_hash']] = record
+    if expired:
+        IdempotencyKey.objects.filter(key_hash__in=expired).delete()
+    return records
+
+
+def _prepare(payloads, products):
+    """Tách lô thành (kết quả đã biết, các đơn cần tạo)"""
+    results = [None] * len(payloads)
+    pending = []
+    for index, payload in enumerate(payloads):
+        if not isinstance(payload, dict):
+            results[index] = _invalid(index, {'non_field_errors': ['Đơn hàng phải là một object.']})
+            continue
+        data = dict(payload)
+        key = data.pop(KEY_FIELD, None)
+        if key is not None and (not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH):
+            results[index] = _invalid(index, {KEY_FIELD: [f'Phải dài từ 1 đến {MAX_KEY_LENGTH} ký tự.']})
+            continue
+        digest = key_hash(ORDER_CREATE_SCOPE, key) if key is not None else None
+        pending.append((index, data, digest, request_hash(data)))
+    return results, pending
+
+
+def create_orders(payloads):
+    """Tạo các đơn hợp lệ trong lô; trả về danh sách kết quả theo thứ tự gửi lên"""
+    products = fetch_products(collect_product_ids(payloads))
+    try:
+        return _create_orders(payloads, products)
+    except IntegrityError:
+        # A concurrent request stored one of our keys first: run again, which
+        # replays that order instead of creating it.
+        return _create_orders(payloads, products)
+
+
+def _create_orders(payloads, products):
+    results, pending = _prepare(payloads, products)
+    records = _lookup_keys({digest for _, _, digest, _ in pending if digest})
+
+    to_create = []
+    duplicates = []
+    claimed = {}
+    for index, data, digest, fingerprint in pending:
+        if digest in records:
+            results[index] = _replayed(index, records[digest], fingerprint)
+            continue
+        if digest in claimed:
+            # Same key twice in one batch: answered from the first occurrence.
+            duplicates.append((index, digest, fingerprint))
+            continue
+        serializer = CreateOrderSerializer(data=data, context={'products': products})
+        if not serializer.is_valid():
+            results[index] = _invalid(index, serializer.errors)
+            continue
+        order, items = serializer.build(serializer.validated_data)
+        to_create.append((index, order, items, digest, fingerprint))
+        if digest:
+            claimed[digest] = index
+
+    if to_create:
+        with transaction.atomic():
+            Order.objects.bulk_create([order for _, order, _, _, _ in to_create])
+            OrderStatusCount.objects.apply(Counter(order.status for _, order, _, _, _ in to_create))
+            OrderItem.objects.bulk_create([item for _, _, items, _, _ in to_create for item in items])
+
+            keys = []
+            for index, order, items, digest, fingerprint in to_create:
+                order._prefetched_objects_cache = {'items': items}
+                data = OrderSerializer(order).data
+                results[index] = {'index': index, 'status': 'created', 'order': data}
+                if digest:
+                    records[digest] = {'request_hash': fingerprint, 'response': data}
+                    keys.append(IdempotencyKey(
+                        key_hash=digest, request_hash=fingerprint, order=order,
+                        status_code=status.HTTP_201_CREATED, response=data,
+                    ))
+            IdempotencyKey.objects.bulk_create(keys)
+        orders_created.send(sender=Order, orders=[order for _, order, _, _, _ in to_create])
+
+    for index, digest, fingerprint in duplicates:
+        results[index] = _replayed(index, records[digest], fingerprint)
+    return results
@@ -0,0 +1,204 @@
+"""
+Hàng đợi pha chế cho màn hình bếp và trang tra cứu đơn hàng.
+
+Các đơn `preparing` và `confirmed` được giữ trong một danh sách đã sắp xếp
+trong bộ nhớ (đơn đang pha trước, sau đó theo thời gian đặt), đọc từ bảng
+`Order` ở lần dùng đầu tiên sau khi process khởi động, rồi được signal của
+đơn hàng cập nhật. Thời gian dự kiến dựa trên số ly của từng đơn và tốc độ
+pha chế đo được: thời gian bếp bận (hợp các khoảng `preparing_at` → `ready_at`
+của các đơn gần nhất) chia cho số ly của các đơn đó, nên tính cả việc nhiều
+người pha song song.
+
+Vị trí và thời gian dự kiến được tính một lần cho cả hàng đợi (`snapshot()`)
+khi hàng đợi thay đổi hoặc sau `SNAPSHOT_MAX_AGE` giây, không tính lại cho mỗi
+request. Giống orders/events.py, hàng đợi nằm trong một process.
+"""
+import bisect
+import threading
+from collections import deque, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from .models import Order, OrderItem
+
+
+# Orders being prepared come before the ones waiting for a barista
+OPEN_STATUSES = ('preparing', 'confirmed')
+
+DEFAULT_SECONDS_PER_ITEM = 90
+DEFAULT_THROUGHPUT_SAMPLE = 30
+SNAPSHOT_MAX_AGE = 30
+
+# Sorted on (rank, created_at, id); the id is unique, so later fields never compare
+QueueItem = namedtuple('QueueItem', ['rank', 'created_at', 'id', 'status', 'items', 'preparing_at'])
+
+# One finished preparation: preparing_at -> ready_at for `items` cups
+Sample = namedtuple('Sample', ['preparing_at', 'ready_at', 'items'])
+
+# Position is 1-based; eta is when the order should be ready
+QueueEntry = namedtuple('QueueEntry', ['id', 'status', 'position', 'items', 'eta'])
+
+Snapshot = namedtuple('Snapshot', ['entries', 'by_id', 'seconds_per_item', 'built_at'])
+
+
+def with_item_counts(queryset):
+    """Thêm `item_count` (tổng số ly) bằng một subquery trên index order_id của OrderItem"""
+    counts = (
+        OrderItem.objects.filter(order=OuterRef('pk')).order_by()
+        .values('order').annotate(total=Sum('quantity')).values('total')
+    )
+    return queryset.annotate(item_count=Subquery(counts))
+
+
+def seconds_per_item(samples):
+    """
+    Số giây bếp bận cho mỗi ly: hợp các khoảng pha chế chia cho tổng số ly;
+    None nếu chưa có mẫu nào
+    """
+    items = sum(sample.items for sample in samples)
+    if not items:
+        return None
+    busy = timedelta()
+    start = end = None
+    for sample in sorted(samples):
+        if end is None or sample.preparing_at > end:
+            if end is not None:
+                busy += end - start
+            start, end = sample.preparing_at, sample.ready_at
+        else:
+            end = max(end, sample.ready_at)
+    busy += end - start
+    return busy.total_seconds() / items
+
+
+def _rank(status):
+    return OPEN_STATUSES.index(status)
+
+
+class KitchenQueue:
+    """Hàng đợi pha chế trong bộ nhớ và các mẫu tốc độ pha chế gần nhất"""
+
+    def __init__(self, sample_size=DEFAULT_THROUGHPUT_SAMPLE, default_seconds_per_item=DEFAULT_SECONDS_PER_ITEM):
+        self.default_seconds_per_item = default_seconds_per_item
+        self._lock = threading.Lock()
+        self._items = []
+        self._by_id = {}
+        self._samples = deque(maxlen=sample_size)
+        # Orders that entered the queue through a bulk transition, which only
+        # carries ids: loaded with the next snapshot, in one query.
+        self._missing = set()
+        self._loaded = False
+        self._snapshot = None
+
+    def _insert(self, item):
+        bisect.insort(self._items, item)
+        self._by_id[item.id] = item
+
+    def _remove(self, order_id):
+        item = self._by_id.pop(order_id, None)
+        if item is not None:
+            del self._items[bisect.bisect_left(self._items, item)]
+        return item
+
+    def _add_rows(self, rows):
+        for row in rows:
+            self._remove(row['id'])
+            self._insert(QueueItem(
+                _rank(row['status']), row['created_at'], row['id'], row['status'],
+                row['item_count'] or 0, row['preparing_at'],
+            ))
+
+    def _open_orders(self, ids=None):
+        queryset = Order.objects.filter(status__in=OPEN_STATUSES)
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        return with_item_counts(queryset.order_by()).values(
+            'id', 'status', 'created_at', 'preparing_at', 'item_count',
+        )
+
+    def _load(self):
+        self._items, self._by_id = [], {}
+        self._add_rows(self._open_orders())
+        recent = with_item_counts(
+            Order.objects.filter(ready_at__isnull=False, preparing_at__isnull=False).order_by('-ready_at')
+        ).values('preparing_at', 'ready_at', 'item_count')[:self._samples.maxlen]
+        self._samples.clear()
+        self._samples.extend(
+            Sample(row['preparing_at'], row['ready_at'], row['item_count'])
+            for row in reversed(recent) if row['item_count'] and row['ready_at'] > row['preparing_at']
+        )
+        self._missing.clear()
+        self._loaded = True
+        self._snapshot = None
+
+    def reload(self):
+        """Đọc lại hàng đợi từ database ở lần `snapshot()` tiếp theo"""
+        with self._lock:
+            self._loaded = False
+
+    def order_changed(self, order_id, status, updated_at):
+        """Đơn `order_id` vừa được tạo hoặc chuyển sang `status` lúc `updated_at`"""
+        with self._lock:
+            if not self._loaded:
+                # The first snapshot reads the current state anyway
+                return
+            item = self._remove(order_id)
+            self._missing.discard(order_id)
+            if item is None and status not in OPEN_STATUSES:
+                return
+            if status == 'ready' and item is not None and item.items and item.preparing_at:
+                if updated_at > item.preparing_at:
+                    self._samples.append(Sample(item.preparing_at, updated_at, item.items))
+            if status in OPEN_STATUSES and item is None:
+                self._missing.add(order_id)
+            elif status in OPEN_STATUSES:
+                preparing_at = item.preparing_at
+                if status == 'preparing' and item.status != status:
+                    preparing_at = updated_at
+                self._insert(item._replace(rank=_rank(status), status=status, preparing_at=preparing_at))
+            self._snapshot = None
+
+    def order_removed(self, order_id):
+        with self._lock:
+            self._missing.discard(order_id)
+            if self._remove(order_id) is not None:
+                self._snapshot = None
+
+    def snapshot(self):
+        """Vị trí và thời gian dự kiến của mọi đơn trong hàng đợi (`Snapshot`)"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if self._missing:
+                self._add_rows(self._open_orders(self._missing))
+                self._missing.clear()
+                self._snapshot = None
+            now = timezone.now()
+            if self._snapshot is None or now - self._snapshot.built_at > timedelta(seconds=SNAPSHOT_MAX_AGE):
+                self._snapshot = self._build(now)
+            return self._snapshot
+
+    def _build(self, now):
+        per_item = seconds_per_item(self._samples) or self.default_seconds_per_item
+        entries = []
+        cursor = now
+        for position, item in enumerate(self._items, 1):
+            work = timedelta(seconds=item.items * per_item)
+            if item.preparing_at:
+                work = max(work - (now - item.preparing_at), timedelta())
+            cursor += work
+            entries.append(QueueEntry(item.id, item.status, position, item.items, cursor))
+        return Snapshot(entries, {entry.id: entry for entry in entries}, per_item, now)
+
+    def entry(self, order_id):
+        """`QueueEntry` của đơn hàng; None nếu đơn không nằm trong hàng đợi"""
+        return self.snapshot().by_id.get(order_id)
+
+
+queue = KitchenQueue(
+    getattr(settings, 'KITCHEN_THROUGHPUT_SAMPLE', DEFAULT_THROUGHPUT_SAMPLE),
+    getattr(settings, 'KITCHEN_DEFAULT_SECONDS_PER_ITEM', DEFAULT_SECONDS_PER_ITEM),
+)
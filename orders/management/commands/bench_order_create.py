@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.models import Order, OrderItem
+from orders.serializers import CreateOrderSerializer
+from products.benchmarking import seed_products
+from products.models import Category, Product
+from trasua_project.query_budget import QueryRecorder
+
+
+def legacy_create(data):
+    """Cách tạo đơn hàng cũ: hai lần Product.objects.get và một INSERT cho mỗi dòng, không transaction"""
+    data = dict(data)
+    items_data = data.pop('items')
+    total_amount = 0
+    for item_data in items_data:
+        product = Product.objects.get(id=item_data['product_id'])
+        total_amount += item_data['quantity'] * product.price
+    order = Order.objects.create(total_amount=total_amount, **data)
+    for item_data in items_data:
+        product = Product.objects.get(id=item_data['product_id'])
+        OrderItem.objects.create(
+            order=order, product=product, quantity=item_data['quantity'], price=product.price,
+        )
+    return order
+
+
+def batched_create(data):
+    serializer = CreateOrderSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+class Command(BaseCommand):
+    help = (
+        'Đo số truy vấn và thông lượng tạo đơn hàng (cách cũ và cách mới) trên database hiện tại. '
+        'Dữ liệu giả được commit thật (để đo cả chi phí commit của SQLite) và xóa khi kết thúc.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--items', type=int, nargs='+', default=[1, 6, 12])
+
+    def handle(self, *args, **options):
+        seeded = seed_products(max(options['items']) * 3)
+        product_ids = list(seeded.values_list('pk', flat=True))
+        category_ids = list(seeded.values_list('category_id', flat=True).distinct())
+        sellable_ids = list(seeded.exclude(status='sold_out').values_list('pk', flat=True))
+        created = []
+        try:
+            for item_count in options['items']:
+                payload = {
+                    'customer_name': 'Benchmark',
+                    'customer_phone': '0900000000',
+                    'customer_address': '1 Đường Lê Lợi, Quận 1',
+                    'payment_method': 'cod',
+                    'items': [{'product_id': pk, 'quantity': 2} for pk in sellable_ids[:item_count]],
+                }
+                self.stdout.write(f'{item_count} sản phẩm / đơn:')
+                baseline = None
+                for label, create in [('cũ', legacy_create), ('batch + atomic', batched_create)]:
+                    queries = QueryRecorder()
+                    queries.start()
+                    try:
+                        created.append(create(payload).pk)
+                    finally:
+                        queries.stop()
+
+                    started = time.perf_counter()
+                    for _ in range(options['orders']):
+                        created.append(create(payload).pk)
+                    rate = options['orders'] / (time.perf_counter() - started)
+                    baseline = baseline or rate
+                    self.stdout.write(
+                        f'  {label:<16} {queries.count:>3} truy vấn  {rate:8.0f} đơn/giây  x{rate / baseline:4.1f}'
+                    )
+        finally:
+            Order.objects.filter(pk__in=created).delete()
+            Product.objects.filter(pk__in=product_ids).delete()
+            Category.objects.filter(pk__in=category_ids).delete()
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from orders.benchmarking import seed_orders
+from orders.serializers import OrderSerializer
+from products.benchmarking import best_of, rollback, seed_products
+from products.projections import ProductProjection
+from trasua_project.renderers import (
+    DEFAULT_STREAMING_CHUNK_SIZE, FastJSONRenderer, MessagePackRenderer, stream_json_list,
+)
+
+
+class Command(BaseCommand):
+    help = 'So sánh tốc độ các renderer trên payload sản phẩm và đơn hàng giả'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/api/', HTTP_HOST='127.0.0.1:8000')
+
+        with rollback():
+            products = seed_products(options['products'])
+            projection = ProductProjection(request=request)
+            payloads = {
+                'products': projection.serialize(projection.values(products.order_by('-created_at', 'id'))),
+            }
+            orders = seed_orders(options['orders'], products[:50])
+            payloads['orders'] = OrderSerializer(
+                orders.prefetch_related('items__product__category'), many=True,
+                context={'request': request},
+            ).data
+
+        stock = JSONRenderer()
+        fast = FastJSONRenderer()
+
+        def streaming(data):
+            chunks = (
+                data[start:start + DEFAULT_STREAMING_CHUNK_SIZE]
+                for start in range(0, len(data), DEFAULT_STREAMING_CHUNK_SIZE)
+            )
+            return b''.join(stream_json_list(chunks, fast.render))
+
+        renderers = [
+            ('JSONRenderer', stock.render),
+            ('FastJSONRenderer', fast.render),
+            ('FastJSONRenderer (streaming)', streaming),
+        ]
+        if MessagePackRenderer.available:
+            renderers.append(('MessagePackRenderer', MessagePackRenderer().render))
+        else:
+            self.stdout.write('(chưa cài msgpack, bỏ qua MessagePackRenderer)')
+
+        for name, data in payloads.items():
+            expected = stock.render(data)
+            self.stdout.write(f'{name}: {len(data)} dòng, {len(expected)} bytes JSON')
+            baseline = None
+            for label, render in renderers:
+                seconds, body = best_of(lambda: render(data), options['repeat'])
+                if label != 'MessagePackRenderer' and body != expected:
+                    raise CommandError(f'{name}: output của {label} khác JSONRenderer')
+                baseline = baseline or seconds
+                self.stdout.write(
+                    f'  {label:<30} {seconds * 1000:9.1f} ms  x{baseline / seconds:5.1f}  {len(body):>9} bytes'
+                )
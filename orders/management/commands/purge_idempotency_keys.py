@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Xóa các Idempotency-Key đã hết hạn (IDEMPOTENCY_KEY_TTL)'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'Đã xóa {deleted} khóa hết hạn'))
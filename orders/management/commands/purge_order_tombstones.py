@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Xóa các tombstone đơn hàng đã hết hạn (ORDER_TOMBSTONE_TTL)'
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Đã xóa {deleted} tombstone hết hạn'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from orders.dashboard import invalidate_dashboard_stats
+from orders.models import Order, OrderStatusCount
+
+
+class Command(BaseCommand):
+    help = 'Đối soát và sửa bộ đếm số đơn hàng theo trạng thái'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Chỉ báo cáo sai lệch, không ghi vào database',
+        )
+
+    def handle(self, *args, **options):
+        counted = OrderStatusCount.objects.as_dict()
+        actual = dict(Order.objects.order_by().values_list('status').annotate(count=Count('id')))
+        drifted = {
+            value: (counted[value], actual.get(value, 0))
+            for value, _ in Order.STATUS_CHOICES
+            if counted[value] != actual.get(value, 0)
+        }
+        for value, (count, correct) in drifted.items():
+            self.stdout.write(f'{value}: {count} -> {correct}')
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Bộ đếm trạng thái đã chính xác'))
+            return
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} trạng thái bị sai lệch'))
+            return
+
+        OrderStatusCount.objects.rebuild()
+        invalidate_dashboard_stats()
+        self.stdout.write(self.style.SUCCESS(f'Đã sửa {len(drifted)} trạng thái'))
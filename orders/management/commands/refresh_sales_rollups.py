@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders import rollups
+
+
+class Command(BaseCommand):
+    help = 'Cập nhật các bảng doanh số theo giờ/ngày từ các đơn hàng thay đổi sau lần chạy trước'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Xóa và tính lại toàn bộ lịch sử đơn hàng')
+        parser.add_argument('--no-numpy', dest='use_numpy', action='store_false', default=None,
+                            help='Cộng dồn bằng Python thuần kể cả khi có cài NumPy')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            result = rollups.rebuild(options['use_numpy'])
+        else:
+            result = rollups.refresh(options['use_numpy'])
+        action = 'Đã tính lại toàn bộ' if result.rebuilt else 'Đã cập nhật'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {result.hours} giờ ({result.rows} dòng theo giờ), '
+            f'mốc mới: {timezone.localtime(rollups.get_watermark()):%Y-%m-%d %H:%M:%S}'
+        ))
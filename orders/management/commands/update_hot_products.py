@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from orders.hot_products import update_hot_products
+
+
+class Command(BaseCommand):
+    help = "Gắn/bỏ trạng thái 'hot' theo số lượng bán trong cửa sổ HOT_PRODUCTS_WINDOW"
+
+    def handle(self, *args, **options):
+        promoted, demoted = update_hot_products()
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã gắn 'hot' cho {len(promoted)} sản phẩm, bỏ 'hot' của {len(demoted)} sản phẩm"
+        ))
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def snapshot_products(apps, schema_editor):
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    Product = apps.get_model('products', 'Product')
+    product = Product.objects.filter(pk=OuterRef('product_id'))
+    # One UPDATE with correlated subqueries, whatever the number of rows
+    OrderItem.objects.filter(product__isnull=False).update(
+        product_name=Subquery(product.values('name')[:1]),
+        product_size=Subquery(product.values('size')[:1]),
+        category_name=Subquery(product.values('category__name')[:1]),
+        product_image=Subquery(product.values('image')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_list_index'),
+        ('products', '0008_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='category_name',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Danh mục'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_image',
+            field=models.ImageField(blank=True, upload_to='products/', verbose_name='Hình ảnh'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(blank=True, max_length=200, verbose_name='Tên sản phẩm'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_size',
+            field=models.CharField(blank=True, choices=[('S', 'Nhỏ'), ('M', 'Vừa'), ('L', 'Lớn')], max_length=1, verbose_name='Kích thước'),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='products.product', verbose_name='Sản phẩm'),
+        ),
+        migrations.RunPython(snapshot_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+from orders.phones import normalize_phone
+
+
+def normalize_phones(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    changed = []
+    for order in Order.objects.only('id', 'customer_phone').iterator(chunk_size=2000):
+        phone = normalize_phone(order.customer_phone)
+        if phone and phone != order.customer_phone:
+            order.customer_phone = phone
+            changed.append(order)
+    Order.objects.bulk_update(changed, ['customer_phone'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_phones, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at', 'id'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer_phone'], name='order_phone_idx'),
+        ),
+    ]
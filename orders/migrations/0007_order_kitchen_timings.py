@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_filters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='preparing_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Bắt đầu chuẩn bị'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='ready_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Sẵn sàng lúc'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-ready_at'], name='order_ready_at_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_kitchen_timings'),
+        ('products', '0009_product_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Mốc cập nhật rollup',
+                'verbose_name_plural': 'Mốc cập nhật rollup',
+            },
+        ),
+        migrations.AddField(
+            model_name='ordertombstone',
+            name='order_created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_name', models.CharField(blank=True, max_length=200)),
+                ('category_name', models.CharField(blank=True, max_length=100)),
+                ('payment_method', models.CharField(choices=[('cod', 'Thanh toán khi nhận hàng'), ('online', 'Thanh toán online')], max_length=20)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('day', models.DateField()),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Doanh số theo ngày',
+                'verbose_name_plural': 'Doanh số theo ngày',
+                'indexes': [models.Index(fields=['day'], name='daily_sales_day_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_name', models.CharField(blank=True, max_length=200)),
+                ('category_name', models.CharField(blank=True, max_length=100)),
+                ('payment_method', models.CharField(choices=[('cod', 'Thanh toán khi nhận hàng'), ('online', 'Thanh toán online')], max_length=20)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('hour', models.DateTimeField()),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Doanh số theo giờ',
+                'verbose_name_plural': 'Doanh số theo giờ',
+                'indexes': [models.Index(fields=['hour'], name='hourly_sales_hour_idx')],
+            },
+        ),
+    ]
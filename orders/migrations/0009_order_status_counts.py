@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:11
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_status_counts(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderStatusCount = apps.get_model('orders', 'OrderStatusCount')
+    actual = dict(Order.objects.order_by().values_list('status').annotate(count=Count('id')))
+    OrderStatusCount.objects.bulk_create([
+        OrderStatusCount(status=value, count=actual.get(value, 0))
+        for value, _ in Order._meta.get_field('status').choices
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Chờ xử lý'), ('confirmed', 'Đã xác nhận'), ('preparing', 'Đang chuẩn bị'), ('ready', 'Sẵn sàng'), ('delivered', 'Đã giao'), ('cancelled', 'Đã hủy')], max_length=20, unique=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Số đơn theo trạng thái',
+                'verbose_name_plural': 'Số đơn theo trạng thái',
+            },
+        ),
+        migrations.RunPython(populate_status_counts, migrations.RunPython.noop),
+    ]
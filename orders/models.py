@@ -1,8 +1,17 @@
 from django.db import models
+from django.db.models import Case, Count, F, Value, When
 from django.contrib.auth.models import User
+from django.utils import timezone
 from products.models import Product
 
 
+# status -> field stamped when an order enters it
+STATUS_TIMESTAMPS = {
+    'preparing': 'preparing_at',
+    'ready': 'ready_at',
+}
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Chờ xử lý'),
@@ -32,6 +41,9 @@ class Order(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Ngày tạo")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Ngày cập nhật")
+    # Kitchen timings, for the preparation throughput (see orders/kitchen.py)
+    preparing_at = models.DateTimeField(null=True, blank=True, verbose_name="Bắt đầu chuẩn bị")
+    ready_at = models.DateTimeField(null=True, blank=True, verbose_name="Sẵn sàng lúc")
     
     # Admin user who processed the order
     processed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Xử lý bởi")
@@ -40,10 +52,36 @@ class Order(models.Model):
         verbose_name = "Đơn hàng"
         verbose_name_plural = "Đơn hàng"
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the order list (KeysetPagination ordering).
+            models.Index(fields=['-created_at', 'id'], name='order_created_id_idx'),
+            # Delta sync keyset (see orders/sync.py)
+            models.Index(fields=['updated_at', 'id'], name='order_updated_id_idx'),
+            # Order list filters (see orders/filters.py)
+            models.Index(fields=['status', '-created_at', 'id'], name='order_status_created_idx'),
+            models.Index(fields=['customer_phone'], name='order_phone_idx'),
+            # Most recent preparation timings (see orders/kitchen.py)
+            models.Index(fields=['-ready_at'], name='order_ready_at_idx'),
+        ]
 
     def __str__(self):
         return f"Đơn hàng #{self.id} - {self.customer_name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so signal handlers can tell status changes
+        # apart from other edits.
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Same timestamps as orders.transitions.transition() sets
+        stamp = STATUS_TIMESTAMPS.get(self.status)
+        if stamp and getattr(self, stamp) is None and self.status != getattr(self, '_loaded_status', None):
+            setattr(self, stamp, timezone.now())
+        super().save(*args, **kwargs)
+
     @property
     def formatted_total(self):
         return f"{float(self.total_amount):,.0f} VNĐ"
@@ -59,9 +97,17 @@ class Order(models.Model):
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items', verbose_name="Đơn hàng")
-    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Sản phẩm")
+    # Deleting a product keeps the order history; the snapshot below still
+    # describes what was sold.
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Sản phẩm")
     quantity = models.PositiveIntegerField(verbose_name="Số lượng")
     price = models.DecimalField(max_digits=10, decimal_places=0, verbose_name="Giá")
+
+    # Product data at order time, so order pages need no catalog joins
+    product_name = models.CharField(max_length=200, blank=True, verbose_name="Tên sản phẩm")
+    product_size = models.CharField(max_length=1, choices=Product.SIZE_CHOICES, blank=True, verbose_name="Kích thước")
+    category_name = models.CharField(max_length=100, blank=True, verbose_name="Danh mục")
+    product_image = models.ImageField(upload_to='products/', blank=True, verbose_name="Hình ảnh")
     
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -70,7 +116,27 @@ class OrderItem(models.Model):
         verbose_name_plural = "Chi tiết đơn hàng"
 
     def __str__(self):
-        return f"{self.product.name} x {self.quantity}"
+        return f"{self.product_name} x {self.quantity}"
+
+    @classmethod
+    def for_product(cls, product, quantity, **kwargs):
+        """Dòng đơn hàng (chưa lưu) kèm bản chụp thông tin sản phẩm hiện tại"""
+        item = cls(product=product, quantity=quantity, price=product.price, **kwargs)
+        item.snapshot_product(product)
+        return item
+
+    def snapshot_product(self, product):
+        """Chép tên, size, danh mục và ảnh hiện tại của sản phẩm vào bản chụp"""
+        self.product_name = product.name
+        self.product_size = product.size
+        self.category_name = product.category.name
+        self.product_image = product.image.name
+
+    def save(self, *args, **kwargs):
+        # Items added one by one (admin inline) take their snapshot on first save
+        if self.product_id and not self.product_name:
+            self.snapshot_product(self.product)
+        super().save(*args, **kwargs)
 
     @property
     def total_price(self):
@@ -82,4 +148,140 @@ class OrderItem(models.Model):
 
     @property
     def formatted_total(self):
-        return f"{float(self.total_price):,.0f} VNĐ"
\ No newline at end of file
+        return f"{float(self.total_price):,.0f} VNĐ"
+
+class IdempotencyKey(models.Model):
+    """Kết quả của một yêu cầu tạo đơn hàng, tra theo header `Idempotency-Key`"""
+
+    # Truncated SHA-256 digests (hex) keep rows small whatever the client sends.
+    key_hash = models.CharField(max_length=32, unique=True)
+    request_hash = models.CharField(max_length=32)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Khóa idempotency"
+        verbose_name_plural = "Khóa idempotency"
+
+    def __str__(self):
+        return self.key_hash
+
+
+class OrderTombstone(models.Model):
+    """Dấu vết của một đơn hàng đã xóa, để client delta sync xóa bản sao của mình"""
+
+    order_id = models.PositiveIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    # Which sales rollup hour the order counted towards (see orders/rollups.py)
+    order_created_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Đơn hàng đã xóa"
+        verbose_name_plural = "Đơn hàng đã xóa"
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"Đơn hàng #{self.order_id}"
+
+
+class OrderStatusCountQuerySet(models.QuerySet):
+    def apply(self, deltas):
+        """Cộng `deltas` ({trạng thái: số đơn thêm/bớt}) vào bộ đếm bằng một câu UPDATE"""
+        deltas = {status: delta for status, delta in deltas.items() if delta}
+        if not deltas:
+            return 0
+        return self.filter(status__in=deltas).update(count=F('count') + Case(
+            *[When(status=status, then=Value(delta)) for status, delta in deltas.items()],
+            default=Value(0), output_field=models.IntegerField(),
+        ))
+
+    def as_dict(self):
+        """{trạng thái: số đơn} cho mọi trạng thái, 0 nếu chưa có dòng đếm"""
+        counts = dict(self.values_list('status', 'count'))
+        return {value: counts.get(value, 0) for value, _ in Order.STATUS_CHOICES}
+
+    def rebuild(self):
+        """Đếm lại số đơn theo trạng thái từ bảng đơn hàng (quét toàn bộ, chỉ dùng khi đối soát)"""
+        actual = dict(Order.objects.order_by().values_list('status').annotate(count=Count('id')))
+        return self.bulk_create(
+            [OrderStatusCount(status=value, count=actual.get(value, 0)) for value, _ in Order.STATUS_CHOICES],
+            update_conflicts=True, unique_fields=['status'], update_fields=['count'],
+        )
+
+
+class OrderStatusCount(models.Model):
+    """Số đơn hàng của một trạng thái, để thống kê không phải đếm lại toàn bộ lịch sử"""
+
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, unique=True)
+    # Signed, so a drifted counter never blocks a write; see reconcile_order_status_counts
+    count = models.IntegerField(default=0)
+
+    objects = OrderStatusCountQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Số đơn theo trạng thái"
+        verbose_name_plural = "Số đơn theo trạng thái"
+
+    def __str__(self):
+        return f"{self.status}: {self.count}"
+
+
+class SalesRollup(models.Model):
+    """Doanh số đã cộng dồn của một sản phẩm, theo phương thức thanh toán (xem orders/rollups.py)"""
+
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Order item snapshot, so deleted products and old names still report
+    product_name = models.CharField(max_length=200, blank=True)
+    category_name = models.CharField(max_length=100, blank=True)
+    payment_method = models.CharField(max_length=20, choices=Order.PAYMENT_CHOICES)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class HourlySales(SalesRollup):
+    hour = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Doanh số theo giờ"
+        verbose_name_plural = "Doanh số theo giờ"
+        indexes = [
+            models.Index(fields=['hour'], name='hourly_sales_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} - {self.product_name}"
+
+
+class DailySales(SalesRollup):
+    day = models.DateField()
+
+    class Meta:
+        verbose_name = "Doanh số theo ngày"
+        verbose_name_plural = "Doanh số theo ngày"
+        indexes = [
+            models.Index(fields=['day'], name='daily_sales_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day:%Y-%m-%d} - {self.product_name}"
+
+
+class RollupWatermark(models.Model):
+    """Mốc thời gian mà các bảng rollup đã được cập nhật tới"""
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Mốc cập nhật rollup"
+        verbose_name_plural = "Mốc cập nhật rollup"
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
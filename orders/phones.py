@@ -0,0 +1,30 @@
+"""Chuẩn hóa số điện thoại Việt Nam về dạng chỉ có chữ số, bắt đầu bằng 0."""
+import re
+
+
+COUNTRY_CODE = '84'
+MIN_DIGITS = 9
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_phone(value):
+    """'+84 901-234-567' -> '0901234567'; chuỗi không có chữ số -> ''"""
+    digits = _NON_DIGITS.sub('', value or '')
+    if digits.startswith(COUNTRY_CODE) and len(digits) > 10:
+        digits = '0' + digits[len(COUNTRY_CODE):]
+    return digits
+
+
+def normalize_phone_prefix(value):
+    """Như `normalize_phone`, cho phần đầu của một số: '+84 90' -> '090'"""
+    digits = _NON_DIGITS.sub('', value or '')
+    # Stored phones all start with 0, so a leading 84 can only be the country code
+    if digits.startswith(COUNTRY_CODE):
+        digits = '0' + digits[len(COUNTRY_CODE):]
+    return digits
+
+
+def looks_like_phone(value):
+    """Chuỗi tìm kiếm chỉ gồm chữ số và dấu phân cách của số điện thoại"""
+    return bool(re.fullmatch(r'[\d\s+().-]+', value or '')) and any(char.isdigit() for char in value)
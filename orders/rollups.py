@@ -0,0 +1,280 @@
+"""
+Bảng doanh số cộng dồn theo giờ (`HourlySales`) và theo ngày (`DailySales`).
+
+Mỗi dòng rollup là số lượng và doanh thu (`quantity * price` của các dòng đơn
+hàng, không tính đơn đã hủy) của một sản phẩm với một phương thức thanh toán
+trong một giờ/ngày, theo giờ đặt hàng. Báo cáo (`/api/orders/reports/sales/`)
+chỉ đọc các bảng này, không quét `OrderItem`.
+
+`refresh()` (lệnh `refresh_sales_rollups`) cập nhật tăng dần từ một mốc
+(`RollupWatermark`): chỉ những giờ có đơn hàng được tạo/sửa/xóa sau mốc mới
+được tính lại từ đầu, rồi các ngày chứa các giờ đó được cộng lại từ bảng theo
+giờ. Lần chạy đầu tiên, hoặc `rebuild()`, tính lại toàn bộ lịch sử theo từng
+khoảng `BACKFILL_WINDOW`. Các dòng đơn hàng được đọc theo từng lô và cộng dồn
+bằng NumPy nếu có cài (sắp xếp theo khóa rồi `np.add.reduceat`), nếu không thì
+bằng Python thuần; hai cách cho cùng kết quả.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .dashboard import REVENUE_EXCLUDED_STATUSES
+from .models import DailySales, HourlySales, Order, OrderItem, OrderTombstone, RollupWatermark
+from .sync import SETTLE_SECONDS
+
+try:
+    import numpy
+except ImportError:  # optional dependency
+    numpy = None
+
+
+WATERMARK = 'sales'
+CHUNK_SIZE = 20000
+BACKFILL_WINDOW = timedelta(days=7)
+HOUR = timedelta(hours=1)
+
+# Hours are counted from the Unix epoch, so buckets are whole UTC hours; days
+# are the local dates of those hours (exact for whole-hour UTC offsets).
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# What refresh() did: `hours` recomputed (all of them when `rebuilt`), `rows` written
+RefreshResult = namedtuple('RefreshResult', ['rebuilt', 'hours', 'rows'])
+
+DIMENSIONS = ['product_id', 'product_name', 'category_name', 'payment_method']
+
+ITEM_COLUMNS = [
+    'order__created_at', 'product_id', 'product_name', 'category_name', 'order__payment_method',
+    'quantity', 'price',
+]
+
+
+def hour_number(moment):
+    return (moment - EPOCH) // HOUR
+
+
+def hour_start(number):
+    return EPOCH + number * HOUR
+
+
+def floor_hour(moment):
+    return hour_start(hour_number(moment))
+
+
+def sold_items(start, end):
+    """`ITEM_COLUMNS` của các dòng đơn hàng đặt trong `[start, end)`, trừ đơn đã hủy"""
+    return (
+        OrderItem.objects
+        .filter(order__created_at__gte=start, order__created_at__lt=end)
+        .exclude(order__status__in=REVENUE_EXCLUDED_STATUSES)
+        .order_by()
+        .values_list(*ITEM_COLUMNS)
+    )
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def aggregate_python(chunk, totals):
+    """Cộng một lô dòng đơn hàng vào `totals`: {(giờ, *DIMENSIONS): [quantity, revenue]}"""
+    for created_at, product_id, product_name, category_name, payment_method, quantity, price in chunk:
+        key = (hour_number(created_at), product_id, product_name, category_name, payment_method)
+        entry = totals.get(key)
+        if entry is None:
+            totals[key] = [quantity, quantity * int(price)]
+        else:
+            entry[0] += quantity
+            entry[1] += quantity * int(price)
+
+
+def aggregate_numpy(chunk, totals):
+    """Như `aggregate_python`, nhưng nhân, sắp xếp và cộng theo khóa bằng mảng NumPy"""
+    count = len(chunk)
+    codes = {}
+    dimension_codes = numpy.fromiter(
+        (codes.setdefault(row[1:5], len(codes)) for row in chunk), dtype=numpy.int64, count=count,
+    )
+    hours = numpy.fromiter((hour_number(row[0]) for row in chunk), dtype=numpy.int64, count=count)
+    quantities = numpy.fromiter((row[5] for row in chunk), dtype=numpy.int64, count=count)
+    prices = numpy.fromiter((int(row[6]) for row in chunk), dtype=numpy.int64, count=count)
+
+    keys = hours * len(codes) + dimension_codes
+    order = numpy.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = numpy.flatnonzero(numpy.concatenate(([True], keys[1:] != keys[:-1])))
+    quantity_sums = numpy.add.reduceat(quantities[order], starts)
+    revenue_sums = numpy.add.reduceat((quantities * prices)[order], starts)
+
+    dimensions = list(codes)
+    for key, quantity, revenue in zip(keys[starts].tolist(), quantity_sums.tolist(), revenue_sums.tolist()):
+        hour, code = divmod(key, len(codes))
+        entry = totals.setdefault((hour, *dimensions[code]), [0, 0])
+        entry[0] += quantity
+        entry[1] += revenue
+
+
+def aggregate(rows, use_numpy=None):
+    """Cộng dồn các dòng đơn hàng theo giờ và `DIMENSIONS`, từng lô `CHUNK_SIZE` dòng"""
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    aggregate_chunk = aggregate_numpy if use_numpy else aggregate_python
+    totals = {}
+    for chunk in _chunks(rows, CHUNK_SIZE):
+        aggregate_chunk(chunk, totals)
+    return totals
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def refresh_range(start, end, use_numpy=None):
+    """
+    Tính lại các giờ trong `[start, end)` (tròn giờ) và các ngày chứa chúng;
+    trả về số dòng theo giờ
+    """
+    totals = aggregate(sold_items(start, end).iterator(chunk_size=CHUNK_SIZE), use_numpy)
+    hourly = [
+        HourlySales(
+            hour=hour_start(hour), product_id=product_id, product_name=product_name,
+            category_name=category_name, payment_method=payment_method,
+            quantity=quantity, revenue=revenue,
+        )
+        for (hour, product_id, product_name, category_name, payment_method), (quantity, revenue) in totals.items()
+    ]
+    # Local dates of the first and the last refreshed hour
+    first_day = timezone.localtime(start).date()
+    end_day = timezone.localtime(end - HOUR).date() + timedelta(days=1)
+    with transaction.atomic():
+        HourlySales.objects.filter(hour__gte=start, hour__lt=end).delete()
+        HourlySales.objects.bulk_create(hourly, batch_size=1000)
+        # Whole days again, from the hourly rows: other hours of those days are unchanged.
+        daily = (
+            HourlySales.objects.filter(hour__gte=_midnight(first_day), hour__lt=_midnight(end_day))
+            .annotate(day=TruncDate('hour')).order_by()
+            .values('day', *DIMENSIONS)
+            .annotate(quantity_sum=Sum('quantity'), revenue_sum=Sum('revenue'))
+        )
+        DailySales.objects.filter(day__gte=first_day, day__lt=end_day).delete()
+        DailySales.objects.bulk_create([
+            DailySales(
+                day=row['day'], product_id=row['product_id'], product_name=row['product_name'],
+                category_name=row['category_name'], payment_method=row['payment_method'],
+                quantity=row['quantity_sum'], revenue=row['revenue_sum'],
+            )
+            for row in daily
+        ], batch_size=1000)
+    return len(hourly)
+
+
+def changed_hours(since, until):
+    """Số thứ tự các giờ có đơn hàng được tạo, sửa hoặc xóa trong `(since, until]`"""
+    created = Order.objects.filter(
+        updated_at__gt=since, updated_at__lte=until,
+    ).values_list('created_at', flat=True)
+    deleted = OrderTombstone.objects.filter(
+        deleted_at__gt=since, deleted_at__lte=until, order_created_at__isnull=False,
+    ).values_list('order_created_at', flat=True)
+    return {hour_number(moment) for moment in created.iterator()} | {hour_number(moment) for moment in deleted}
+
+
+def hour_ranges(hours):
+    """Gộp các giờ liền nhau thành các khoảng `[start, end)`"""
+    ranges = []
+    for hour in sorted(hours):
+        if ranges and ranges[-1][1] == hour:
+            ranges[-1][1] = hour + 1
+        else:
+            ranges.append([hour, hour + 1])
+    return [(hour_start(start), hour_start(end)) for start, end in ranges]
+
+
+def get_watermark():
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    return watermark.value if watermark else None
+
+
+def _set_watermark(value):
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'value': value})
+
+
+def _settled():
+    # Rows are stamped before their transaction commits: stay behind the
+    # newest changes, as orders/sync.py does.
+    return timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+
+
+def backfill(start, end, use_numpy=None):
+    """
+    Tính lại mọi giờ từ giờ chứa `start` tới giờ chứa `end`, mỗi lần một
+    khoảng `BACKFILL_WINDOW`; trả về `(số giờ, số dòng theo giờ)`
+    """
+    start, end = floor_hour(start), floor_hour(end) + HOUR
+    hours = (end - start) // HOUR
+    rows = 0
+    while start < end:
+        window_end = min(start + BACKFILL_WINDOW, end)
+        rows += refresh_range(start, window_end, use_numpy)
+        start = window_end
+    return hours, rows
+
+
+def rebuild(use_numpy=None):
+    """Xóa các bảng rollup và tính lại toàn bộ lịch sử đơn hàng"""
+    until = _settled()
+    first = Order.objects.order_by('created_at').values_list('created_at', flat=True).first()
+    with transaction.atomic():
+        HourlySales.objects.all().delete()
+        DailySales.objects.all().delete()
+    hours, rows = backfill(first, until, use_numpy) if first is not None else (0, 0)
+    # Changes after `until` are picked up by the next refresh().
+    _set_watermark(until)
+    return RefreshResult(True, hours, rows)
+
+
+def refresh(use_numpy=None):
+    """Cập nhật các rollup theo những thay đổi sau mốc đã lưu (lần đầu: `rebuild()`)"""
+    since = get_watermark()
+    if since is None:
+        return rebuild(use_numpy)
+    until = _settled()
+    if until <= since:
+        return RefreshResult(False, 0, 0)
+    hours = changed_hours(since, until)
+    rows = sum(refresh_range(start, end, use_numpy) for start, end in hour_ranges(hours))
+    _set_watermark(until)
+    return RefreshResult(False, len(hours), rows)
+
+
+# group_by -> rollup columns a report row is keyed by
+REPORT_GROUPS = {
+    'product': ['product_id', 'product_name', 'category_name'],
+    'category': ['category_name'],
+    'payment_method': ['payment_method'],
+}
+
+
+def sales_report(granularity, group_by, date_from, date_to):
+    """
+    Doanh số theo `granularity` ('hour' hoặc 'day') và `group_by`, từ ngày
+    `date_from` tới hết ngày `date_to`; chỉ đọc bảng rollup
+    """
+    if granularity == 'hour':
+        queryset = HourlySales.objects.filter(
+            hour__gte=_midnight(date_from), hour__lt=_midnight(date_to + timedelta(days=1)),
+        )
+    else:
+        queryset = DailySales.objects.filter(day__gte=date_from, day__lte=date_to)
+    columns = [granularity, *REPORT_GROUPS[group_by]]
+    return list(
+        queryset.values(*columns)
+        .annotate(quantity_sum=Sum('quantity'), revenue_sum=Sum('revenue'))
+        .order_by(*columns)
+    )
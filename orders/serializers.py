@@ -1,8 +1,22 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Order, OrderItem
+from .phones import MIN_DIGITS, normalize_phone
+from .rollups import REPORT_GROUPS
+from products.models import Product
 from products.serializers import ProductSerializer
 
 
+MAX_ITEMS_PER_ORDER = 50
+MAX_QUANTITY_PER_ITEM = 100
+MAX_ORDERS_PER_TRANSITION = 200
+DEFAULT_REPORT_DAYS = 30
+MAX_HOURLY_REPORT_DAYS = 31
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.IntegerField(write_only=True)
@@ -13,8 +27,26 @@ class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = [
-            'id', 'product', 'product_id', 'quantity', 'price',
-            'total_price', 'formatted_price', 'formatted_total'
+            'id', 'product', 'product_id', 'product_name', 'product_size', 'category_name',
+            'quantity', 'price', 'total_price', 'formatted_price', 'formatted_total'
+        ]
+        read_only_fields = ['product_name', 'product_size', 'category_name']
+
+
+class CompactOrderItemSerializer(serializers.ModelSerializer):
+    """Dòng sản phẩm gọn cho danh sách đơn hàng, đọc từ bản chụp trên `OrderItem`"""
+    product_id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(source='product_name', read_only=True)
+    size = serializers.CharField(source='product_size', read_only=True)
+    image = serializers.ImageField(source='product_image', read_only=True)
+    total_price = serializers.DecimalField(max_digits=10, decimal_places=0, read_only=True)
+    formatted_total = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = [
+            'id', 'product_id', 'name', 'size', 'image', 'quantity', 'price',
+            'total_price', 'formatted_total'
         ]
 
 
@@ -35,53 +67,132 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class OrderItemInputSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_QUANTITY_PER_ITEM)
+
+
+class CompactOrderSerializer(OrderSerializer):
+    items = CompactOrderItemSerializer(many=True, read_only=True)
+
+
 class CreateOrderSerializer(serializers.Serializer):
     customer_name = serializers.CharField(max_length=100)
-    customer_phone = serializers.CharField(max_length=15)
+    # Spaces, dashes and +84 are allowed here; the stored number is digits only.
+    customer_phone = serializers.CharField(max_length=20)
     customer_address = serializers.CharField()
     customer_email = serializers.EmailField(required=False, allow_blank=True)
     payment_method = serializers.ChoiceField(choices=Order.PAYMENT_CHOICES, default='cod')
     notes = serializers.CharField(required=False, allow_blank=True)
-    items = serializers.ListField(
-        child=serializers.DictField(),
-        write_only=True
-    )
+    items = OrderItemInputSerializer(many=True, write_only=True)
+
+    def validate_customer_phone(self, value):
+        phone = normalize_phone(value)
+        if not MIN_DIGITS <= len(phone) <= Order._meta.get_field('customer_phone').max_length:
+            raise serializers.ValidationError('Số điện thoại không hợp lệ.')
+        return phone
     
     def validate_items(self, value):
         if not value:
             raise serializers.ValidationError("Đơn hàng phải có ít nhất một sản phẩm.")
+        if len(value) > MAX_ITEMS_PER_ORDER:
+            raise serializers.ValidationError(
+                f"Đơn hàng có tối đa {MAX_ITEMS_PER_ORDER} sản phẩm."
+            )
+
+        # One query for every product of the order (or of the whole batch,
+        # passed in the context by the bulk intake), then validate up front.
+        products = self.context.get('products')
+        if products is None:
+            products = fetch_products(item['product_id'] for item in value)
+
+        # Same error layout as a nested list serializer: one entry per item.
+        errors = [{} for _ in value]
+        for error, item in zip(errors, value):
+            product = products.get(item['product_id'])
+            if product is None:
+                error['product_id'] = [f"Sản phẩm #{item['product_id']} không tồn tại."]
+            elif not product.is_available or product.status == 'sold_out':
+                error['product_id'] = [f"Sản phẩm \"{product.name}\" hiện không có sẵn."]
+            else:
+                item['product'] = product
+        if any(errors):
+            raise serializers.ValidationError(errors)
         return value
     
-    def create(self, validated_data):
+    def build(self, validated_data):
+        """Đơn hàng và các dòng sản phẩm (chưa lưu) từ dữ liệu đã validate"""
+        validated_data = dict(validated_data)
         items_data = validated_data.pop('items')
-        
-        # Calculate total amount first
-        total_amount = 0
-        for item_data in items_data:
-            from products.models import Product
-            product = Product.objects.get(id=item_data['product_id'])
-            quantity = item_data['quantity']
-            price = product.price
-            total_amount += quantity * price
-        
-        # Create order with total_amount
-        order = Order.objects.create(
-            total_amount=total_amount,
-            **validated_data
-        )
-        
-        # Create order items
-        for item_data in items_data:
-            from products.models import Product
-            product = Product.objects.get(id=item_data['product_id'])
-            quantity = item_data['quantity']
-            price = product.price
-            
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=quantity,
-                price=price
-            )
-        
+        total_amount = sum(item['quantity'] * item['product'].price for item in items_data)
+
+        order = Order(total_amount=total_amount, **validated_data)
+        items = [
+            OrderItem.for_product(item['product'], item['quantity'], order=order)
+            for item in items_data
+        ]
+        return order, items
+
+    def create(self, validated_data):
+        order, items = self.build(validated_data)
+        with transaction.atomic():
+            order.save()
+            OrderItem.objects.bulk_create(items)
+            # The items and their products are already in memory; serve
+            # order.items from them instead of querying again. Set before the
+            # block ends: the on_commit hooks of order_saved read them too.
+            order._prefetched_objects_cache = {'items': items}
         return order
+
+
+def fetch_products(product_ids):
+    """{id: Product} cho các sản phẩm của một hoặc nhiều đơn hàng, trong một truy vấn"""
+    return Product.objects.select_related('category').in_bulk(set(product_ids))
+
+
+class OrderStatusTransitionSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), min_length=1, max_length=MAX_ORDERS_PER_TRANSITION,
+    )
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
+
+class TransitionResultSerializer(serializers.Serializer):
+    """Kết quả gọn của một lần đổi trạng thái: không đọc lại đơn hàng"""
+    id = serializers.IntegerField()
+    result = serializers.CharField()
+    status = serializers.CharField(allow_null=True)
+    status_display = serializers.SerializerMethodField()
+    updated_at = serializers.DateTimeField(allow_null=True)
+
+    def get_status_display(self, result):
+        return dict(Order.STATUS_CHOICES).get(result.status)
+
+
+class KitchenQueueEntrySerializer(serializers.Serializer):
+    """Vị trí và thời gian dự kiến của một đơn trong hàng đợi pha chế"""
+    id = serializers.IntegerField()
+    status = serializers.CharField()
+    position = serializers.IntegerField()
+    items = serializers.IntegerField()
+    eta = serializers.DateTimeField()
+
+
+class SalesReportQuerySerializer(serializers.Serializer):
+    """Tham số của báo cáo doanh số; mặc định 30 ngày gần nhất theo ngày và sản phẩm"""
+    granularity = serializers.ChoiceField(choices=['day', 'hour'], default='day')
+    group_by = serializers.ChoiceField(choices=sorted(REPORT_GROUPS), default='product')
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        date_to = attrs.get('date_to') or timezone.localdate()
+        date_from = attrs.get('date_from') or date_to - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+        if date_from > date_to:
+            raise serializers.ValidationError('date_from phải trước date_to.')
+        if attrs['granularity'] == 'hour' and (date_to - date_from).days >= MAX_HOURLY_REPORT_DAYS:
+            raise serializers.ValidationError(
+                f'Báo cáo theo giờ chỉ cho tối đa {MAX_HOURLY_REPORT_DAYS} ngày.'
+            )
+        attrs['date_from'], attrs['date_to'] = date_from, date_to
+        return attrs
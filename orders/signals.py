@@ -0,0 +1,79 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import events, hot_products, kitchen
+from .dashboard import invalidate_dashboard_stats
+from .models import Order, OrderStatusCount, OrderTombstone
+
+
+# Sent after orders are inserted with bulk_create (no post_save), with
+# `orders=[Order, ...]`. The sender has already updated OrderStatusCount.
+orders_created = Signal()
+
+# Sent after orders.transitions changed statuses with QuerySet.update() (no
+# post_save), with `order_ids=[...]`, `status` and `updated_at`. The sender
+# has already updated OrderStatusCount.
+order_status_changed = Signal()
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Cập nhật bộ đếm trạng thái, xóa cache thống kê, phát sự kiện và cập nhật
+    hàng đợi pha chế khi có đơn mới hoặc đơn đổi trạng thái; đơn mới được tính
+    vào tốc độ bán của sản phẩm
+    """
+    if raw:
+        return
+    loaded_status = getattr(instance, '_loaded_status', None)
+    status_changed = instance.status != loaded_status
+    if created:
+        OrderStatusCount.objects.apply({instance.status: 1})
+    elif status_changed and loaded_status is not None:
+        OrderStatusCount.objects.apply({loaded_status: -1, instance.status: 1})
+    if created:
+        transaction.on_commit(invalidate_dashboard_stats)
+        # After commit, so the order items exist when the event is built.
+        transaction.on_commit(partial(events.publish_created, instance))
+        transaction.on_commit(partial(hot_products.record_order, instance))
+    elif status_changed:
+        transaction.on_commit(invalidate_dashboard_stats)
+        transaction.on_commit(partial(
+            events.publish_status_changed, instance.pk, instance.status, instance.updated_at,
+        ))
+    if created or status_changed:
+        transaction.on_commit(partial(kitchen.queue.order_changed, instance.pk, instance.status, instance.updated_at))
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    """
+    Cập nhật bộ đếm trạng thái, xóa cache thống kê, ghi tombstone cho delta
+    sync và bỏ đơn khỏi hàng đợi pha chế khi xóa đơn hàng
+    """
+    OrderStatusCount.objects.apply({instance.status: -1})
+    OrderTombstone.objects.create(order_id=instance.pk, order_created_at=instance.created_at)
+    transaction.on_commit(invalidate_dashboard_stats)
+    transaction.on_commit(partial(kitchen.queue.order_removed, instance.pk))
+
+
+@receiver(orders_created, sender=Order)
+def invalidate_dashboard_on_bulk_create(sender, orders, **kwargs):
+    """Xóa cache thống kê, phát sự kiện và tính tốc độ bán khi nhận đơn hàng theo lô"""
+    transaction.on_commit(invalidate_dashboard_stats)
+    for order in orders:
+        transaction.on_commit(partial(events.publish_created, order))
+        transaction.on_commit(partial(hot_products.record_order, order))
+
+
+@receiver(order_status_changed, sender=Order)
+def order_status_updated(sender, order_ids, status, updated_at, **kwargs):
+    """Xóa cache thống kê, phát sự kiện và cập nhật hàng đợi pha chế khi đổi trạng thái nhiều đơn một lần"""
+    transaction.on_commit(invalidate_dashboard_stats)
+    for order_id in order_ids:
+        transaction.on_commit(partial(events.publish_status_changed, order_id, status, updated_at))
+        transaction.on_commit(partial(kitchen.queue.order_changed, order_id, status, updated_at))
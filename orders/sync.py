@@ -0,0 +1,132 @@
+"""
+Đồng bộ tăng dần (delta sync) cho màn hình bếp và máy POS.
+
+`GET /api/orders/sync/?updated_since=<cursor>` trả về các đơn hàng có
+`updated_at` sau cursor (theo thứ tự `(updated_at, id)`) và id các đơn đã bị
+xóa (`OrderTombstone`). Lần đầu gọi không có cursor để nhận toàn bộ; sau đó
+luôn gửi lại `cursor` của response trước. Client áp dụng `deleted` trước rồi
+mới cập nhật `orders`. Cả hai truy vấn đi theo index `(updated_at, id)` /
+`(deleted_at, id)`, nên chi phí tỷ lệ với số thay đổi chứ không với số đơn.
+
+Cursor cũ hơn `ORDER_TOMBSTONE_TTL` (tombstone đã bị xóa) cho `reset: true`:
+client bỏ dữ liệu cũ, nhận lại từ đầu.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import OrderTombstone
+
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+DEFAULT_TOMBSTONE_TTL = 30 * 24 * 60 * 60
+
+# Rows are stamped before their transaction commits, so a row committed just
+# now may carry a slightly older timestamp than one already returned. The
+# cursor never moves past `now - SETTLE_SECONDS`; recent rows may be sent twice.
+SETTLE_SECONDS = 2
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# (updated_at, order id) of the last order and (deleted_at, tombstone id) of
+# the last tombstone the client has seen
+SyncCursor = namedtuple('SyncCursor', ['updated_at', 'order_id', 'deleted_at', 'tombstone_id'])
+
+
+class SyncCursorError(ValueError):
+    pass
+
+
+def _to_int(value):
+    return (value - EPOCH) // MICROSECOND
+
+
+def _from_int(value):
+    return EPOCH + value * MICROSECOND
+
+
+def encode_cursor(cursor):
+    return '.'.join([
+        str(_to_int(cursor.updated_at)), str(cursor.order_id),
+        str(_to_int(cursor.deleted_at)), str(cursor.tombstone_id),
+    ])
+
+
+def decode_cursor(value):
+    try:
+        updated_at, order_id, deleted_at, tombstone_id = (int(part) for part in value.split('.'))
+        return SyncCursor(_from_int(updated_at), order_id, _from_int(deleted_at), tombstone_id)
+    except (ValueError, OverflowError):
+        raise SyncCursorError('Cursor không hợp lệ.')
+
+
+def tombstone_cutoff():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'ORDER_TOMBSTONE_TTL', DEFAULT_TOMBSTONE_TTL))
+
+
+def purge_tombstones():
+    """Xóa các tombstone đã hết hạn; trả về số dòng đã xóa"""
+    deleted, _ = OrderTombstone.objects.filter(deleted_at__lt=tombstone_cutoff()).delete()
+    return deleted
+
+
+def initial_cursor(settled):
+    # Everything from the beginning; deletions before now do not matter.
+    return SyncCursor(EPOCH, 0, settled, 0)
+
+
+def after(queryset, field, timestamp, pk):
+    """Các dòng có `(field, id) > (timestamp, pk)`: một khoảng trên index `(field, id)`"""
+    return queryset.filter(**{f'{field}__gte': timestamp}).exclude(**{field: timestamp, 'id__lte': pk})
+
+
+def _advance(rows, field, timestamp, pk, has_more, settled):
+    """Vị trí mới của một luồng sau khi trả về `rows` (không bao giờ lùi lại)"""
+    if rows and (has_more or getattr(rows[-1], field) <= settled):
+        return getattr(rows[-1], field), rows[-1].id
+    # Stop short of rows that may still be joined by older, uncommitted ones.
+    # An idle stream moves up to `settled` too, so its cursor never expires.
+    return (settled, 0) if settled > timestamp else (timestamp, pk)
+
+
+def changes(queryset, cursor=None, limit=DEFAULT_LIMIT):
+    """
+    Các thay đổi sau `cursor` (None: đồng bộ từ đầu), tối đa `limit` đơn và
+    `limit` tombstone: `{orders, deleted, cursor, has_more, reset}`
+    """
+    settled = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    reset = cursor is not None and cursor.deleted_at < tombstone_cutoff()
+    if cursor is None or reset:
+        cursor = initial_cursor(settled)
+
+    orders = list(
+        after(queryset, 'updated_at', cursor.updated_at, cursor.order_id)
+        .order_by('updated_at', 'id')[:limit + 1]
+    )
+    more_orders = len(orders) > limit
+    orders = orders[:limit]
+
+    tombstones = list(
+        after(OrderTombstone.objects.all(), 'deleted_at', cursor.deleted_at, cursor.tombstone_id)
+        .order_by('deleted_at', 'id').only('id', 'order_id', 'deleted_at')[:limit + 1]
+    )
+    more_tombstones = len(tombstones) > limit
+    tombstones = tombstones[:limit]
+
+    updated_at, order_id = _advance(
+        orders, 'updated_at', cursor.updated_at, cursor.order_id, more_orders, settled,
+    )
+    deleted_at, tombstone_id = _advance(
+        tombstones, 'deleted_at', cursor.deleted_at, cursor.tombstone_id, more_tombstones, settled,
+    )
+    return {
+        'orders': orders,
+        'deleted': [tombstone.order_id for tombstone in tombstones],
+        'cursor': SyncCursor(updated_at, order_id, deleted_at, tombstone_id),
+        'has_more': more_orders or more_tombstones,
+        'reset': reset,
+    }
@@ -1,3 +1,651 @@
-from django.test import TestCase
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from urllib.parse import urlencode
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from products.benchmarking import seed_products
+from products.models import Product
+from products.pagination import KeysetPagination
+from trasua_project.query_budget import assert_query_budget
+
+from . import dashboard, events, hot_products, idempotency, kitchen, rollups
+from .benchmarking import seed_orders
+from .intake import MAX_BATCH_SIZE
+from .models import HourlySales, Order, OrderItem, OrderStatusCount, OrderTombstone
+from .transitions import transition
+from .views import BulkCreateOrderView, CreateOrderView, OrderListView
+
+
+# Write views held to their query budget are tested with TransactionTestCase:
+# inside TestCase their outer atomic block becomes a SAVEPOINT/RELEASE pair,
+# where production runs a BEGIN (counted) and a COMMIT (not counted).
+
+def available_products(count):
+    products = seed_products(count)
+    products.update(status='', is_available=True)
+    return list(products.select_related('category'))
+
+
+def order_payload(products, quantity=1, **kwargs):
+    payload = {
+        'customer_name': 'Nguyễn Văn A',
+        'customer_phone': '0901 234 567',
+        'customer_address': '1 Đường Lê Lợi, Quận 1',
+        'payment_method': 'cod',
+        'items': [{'product_id': product.pk, 'quantity': quantity} for product in products],
+    }
+    payload.update(kwargs)
+    return payload
+
+
+def item_reads(queries):
+    return [query['sql'] for query in queries if query['sql'].startswith('SELECT') and 'orders_orderitem' in query['sql']]
+
+
+def make_order(**kwargs):
+    fields = {
+        'customer_name': 'Nguyễn Văn A',
+        'customer_phone': '0901234567',
+        'customer_address': '1 Đường Lê Lợi, Quận 1',
+        'total_amount': 0,
+    }
+    fields.update(kwargs)
+    return Order.objects.create(**fields)
+
+
+class OrderItemSnapshotTests(TestCase):
+    def test_item_saved_without_snapshot_takes_one(self):
+        # As the admin inline does: only product, quantity and price are set
+        product = seed_products(1).select_related('category').get()
+        item = OrderItem(order=make_order(), product=product, quantity=2, price=product.price)
+        item.save()
+
+        item.refresh_from_db()
+        self.assertEqual(item.product_name, product.name)
+        self.assertEqual(item.product_size, product.size)
+        self.assertEqual(item.category_name, product.category.name)
+        self.assertEqual(item.product_image.name, product.image.name)
+
+    def test_existing_snapshot_is_kept(self):
+        product = seed_products(1).get()
+        item = OrderItem.for_product(product, 1, order=make_order())
+        item.save()
+        Product.objects.filter(pk=product.pk).update(name='Tên mới')
+
+        item = OrderItem.objects.get(pk=item.pk)
+        item.quantity = 3
+        item.save()
+        item.refresh_from_db()
+        self.assertNotEqual(item.product_name, 'Tên mới')
+
+
+# The background hot-product ranking would open its own connection mid-test
+@override_settings(HOT_PRODUCTS_AUTO=False)
+class CreateOrderCommitHooksTests(TransactionTestCase):
+    # Real commits: the order_saved hooks run when the create transaction ends
+    def test_commit_hooks_reuse_the_created_items(self):
+        products = available_products(3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/orders/create/', order_payload(products), content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(item_reads(queries), [])
+
+
+class RecordOrderTests(TransactionTestCase):
+    def test_created_order_is_counted_without_reading_its_items(self):
+        products = available_products(2)
+        counter = hot_products.VelocityCounter(3600, 300)
+        counter.load([], timezone.now())
+        with mock.patch.object(hot_products, 'counter', counter), \
+                mock.patch.object(hot_products, 'schedule_update'):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    '/api/orders/create/', order_payload(products, quantity=2), content_type='application/json',
+                )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(counter.totals(timezone.now()), {product.pk: 2 for product in products})
+        self.assertEqual(item_reads(queries), [])
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, HOT_PRODUCTS_AUTO=False)
+class OrderQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = available_products(10)
+        seed_orders(40, cls.products)
+
+    def test_order_list(self):
+        queries = ['', '?items=compact', '?page_size=100', '?status=pending&status=confirmed', '?search=0900']
+        for query in queries:
+            with self.subTest(query=query), assert_query_budget(OrderListView.query_budget):
+                self.assertEqual(self.client.get(f'/api/orders/{query}').status_code, 200)
+
+    def test_order_list_is_paginated_by_default(self):
+        body = self.client.get('/api/orders/').json()
+
+        self.assertEqual(len(body['results']), KeysetPagination.page_size)
+        self.assertIsNotNone(body['next'])
+
+
+class OrderFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.pending = make_order(customer_phone='0901234567')
+        cls.confirmed = make_order(status='confirmed', customer_phone='0912345678')
+        cls.delivered = make_order(status='delivered', customer_name='Trần Thị B', customer_phone='0281234567')
+        Order.objects.filter(pk=cls.delivered.pk).update(created_at=timezone.now() - timedelta(days=10))
+
+    def ids(self, query):
+        response = self.client.get(f'/api/orders/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {order['id'] for order in response.json()['results']}
+
+    def test_repeated_status(self):
+        self.assertEqual(self.ids('status=pending&status=confirmed'), {self.pending.pk, self.confirmed.pk})
+        self.assertEqual(self.ids('status=delivered'), {self.delivered.pk})
+
+    def test_date_bounds_include_both_days(self):
+        today = timezone.localdate()
+        self.assertEqual(
+            self.ids(f'created_after={today}&created_before={today}'), {self.pending.pk, self.confirmed.pk},
+        )
+        self.assertEqual(
+            self.ids(f'created_before={today - timedelta(days=10)}'), {self.delivered.pk},
+        )
+        self.assertEqual(self.ids(f'created_after={today + timedelta(days=1)}'), set())
+
+    def test_phone_prefix_search_is_normalized(self):
+        searches = {
+            '090': {self.pending.pk},
+            '0901 234': {self.pending.pk},
+            '+84 901': {self.pending.pk},
+            '(+84) 90-1': {self.pending.pk},
+            '+84 9': {self.pending.pk, self.confirmed.pk},
+            '0281': {self.delivered.pk},
+            'trần thị': {self.delivered.pk},
+        }
+        for search, expected in searches.items():
+            with self.subTest(search=search):
+                self.assertEqual(self.ids(urlencode({'search': search})), expected)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, HOT_PRODUCTS_AUTO=False)
+class CreateOrderQueryBudgetTests(TransactionTestCase):
+    def test_create_order(self):
+        products = available_products(10)
+        for headers in [{}, {'Idempotency-Key': 'budget-test'}]:
+            with self.subTest(headers=headers), assert_query_budget(CreateOrderView.query_budget):
+                response = self.client.post(
+                    '/api/orders/create/', order_payload(products), content_type='application/json',
+                    headers=headers,
+                )
+                self.assertEqual(response.status_code, 201)
+
+
+@override_settings(HOT_PRODUCTS_AUTO=False)
+class CreateOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = available_products(10)
+
+    def create(self, payload, **headers):
+        return self.client.post('/api/orders/create/', payload, content_type='application/json', headers=headers)
+
+    def test_query_count_does_not_depend_on_item_count(self):
+        counts = []
+        for products in [self.products[:1], self.products]:
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.create(order_payload(products)).status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_unavailable_item_rejects_the_whole_order(self):
+        Product.objects.filter(pk=self.products[1].pk).update(status='sold_out')
+        response = self.create(order_payload(self.products[:3]))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['items'][0], {})
+        self.assertIn('product_id', response.json()['items'][1])
+        self.assertFalse(Order.objects.exists())
+
+    def test_failed_item_insert_rolls_back_the_order(self):
+        with mock.patch.object(OrderItem.objects, 'bulk_create', side_effect=IntegrityError('boom')):
+            with self.assertRaises(IntegrityError):
+                self.create(order_payload(self.products[:3]))
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+
+@override_settings(HOT_PRODUCTS_AUTO=False)
+class IdempotentCreateOrderTests(TransactionTestCase):
+    def setUp(self):
+        self.products = available_products(3)
+
+    def create(self, payload, key='order-1'):
+        return self.client.post(
+            '/api/orders/create/', payload, content_type='application/json', headers={'Idempotency-Key': key},
+        )
+
+    def test_retry_replays_the_first_response(self):
+        payload = order_payload(self.products)
+        first = self.create(payload)
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.create(payload)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        # Only the key lookup: the orders tables are not touched
+        self.assertEqual(len(queries), 1)
+
+    def test_reused_key_with_another_payload_is_rejected(self):
+        self.create(order_payload(self.products))
+        response = self.create(order_payload(self.products, quantity=2))
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_concurrent_duplicate_collapses_into_the_first_order(self):
+        payload = order_payload(self.products)
+        first = self.create(payload)
+        # The duplicate looked the key up before the first request committed
+        with mock.patch.object(idempotency, 'find_record', return_value=None):
+            duplicate = self.create(payload)
+
+        self.assertEqual(duplicate.status_code, 201)
+        self.assertEqual(duplicate.json()['id'], first.json()['id'])
+        self.assertEqual(duplicate.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.count(), len(self.products))
+
+
+@override_settings(HOT_PRODUCTS_AUTO=False)
+class BulkCreateOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = available_products(3)
+
+    def post(self, payloads):
+        return self.client.post('/api/orders/bulk/', payloads, content_type='application/json')
+
+    def test_each_order_gets_its_own_result(self):
+        replayed = order_payload(self.products[:1], idempotency_key='pos-1')
+        self.assertEqual(self.post([replayed]).json()['created'], 1)
+
+        payloads = [
+            order_payload(self.products, idempotency_key='pos-2'),
+            order_payload(self.products, items=[{'product_id': 999999, 'quantity': 1}]),
+            replayed,
+            'not an order',
+            order_payload(self.products, idempotency_key='pos-2'),
+            order_payload(self.products[:2]),
+        ]
+        with assert_query_budget(BulkCreateOrderView.query_budget):
+            response = self.post(payloads)
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            [result['status'] for result in body['results']],
+            ['created', 'invalid', 'replayed', 'invalid', 'replayed', 'created'],
+        )
+        self.assertEqual([result['index'] for result in body['results']], list(range(len(payloads))))
+        self.assertEqual((body['created'], body['replayed'], body['invalid']), (2, 2, 2))
+        self.assertIn('items', body['results'][1]['errors'])
+        # Same key twice in one batch: one order, answered twice
+        self.assertEqual(body['results'][4]['order'], body['results'][0]['order'])
+        self.assertEqual(Order.objects.count(), 3)
+        self.assertEqual(
+            list(Order.objects.get(pk=body['results'][5]['order']['id']).items.order_by('pk').values_list('product_id', flat=True)),
+            [product.pk for product in self.products[:2]],
+        )
+
+    def test_oversized_batch_is_rejected(self):
+        response = self.post([order_payload(self.products)] * (MAX_BATCH_SIZE + 1))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+@override_settings(HOT_PRODUCTS_AUTO=False)
+class OrderStatusTransitionTests(TransactionTestCase):
+    def patch(self, order_id, status):
+        return self.client.patch(f'/api/orders/{order_id}/status/', {'status': status}, content_type='application/json')
+
+    def test_allowed_transition(self):
+        order = make_order(status='confirmed')
+        response = self.patch(order.pk, 'preparing')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['result'], 'updated')
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'preparing')
+        self.assertIsNotNone(order.preparing_at)
+
+    def test_rejected_transition_is_a_conflict(self):
+        order = make_order(status='delivered')
+        response = self.patch(order.pk, 'preparing')
+
+        self.assertEqual(response.status_code, 409)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'delivered')
+        self.assertIsNone(order.preparing_at)
+
+    def test_unknown_order(self):
+        self.assertEqual(self.patch(999999, 'confirmed').status_code, 404)
+
+    def test_bulk_transition_reports_each_order(self):
+        pending, delivered, confirmed = (make_order(status=status) for status in ['pending', 'delivered', 'confirmed'])
+        response = self.client.post(
+            '/api/orders/status/', {'order_ids': [pending.pk, delivered.pk, confirmed.pk, 999999], 'status': 'confirmed'},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            [result['result'] for result in body['results']], ['updated', 'rejected', 'unchanged', 'not_found'],
+        )
+        self.assertEqual((body['updated'], body['unchanged'], body['rejected'], body['not_found']), (1, 1, 1, 1))
+
+
+class OrderStatusCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        OrderStatusCount.objects.rebuild()
+        cls.products = available_products(2)
+
+    def assertCountsMatchOrders(self):
+        actual = Counter(Order.objects.values_list('status', flat=True))
+        self.assertEqual(
+            OrderStatusCount.objects.as_dict(), {value: actual[value] for value, _ in Order.STATUS_CHOICES},
+        )
+
+    def test_counters_follow_every_write(self):
+        order = make_order()
+        self.assertCountsMatchOrders()
+
+        order.status = 'confirmed'
+        order.save()
+        self.assertCountsMatchOrders()
+
+        others = [make_order(status='pending'), make_order(status='delivered')]
+        transition([order.pk] + [other.pk for other in others], 'cancelled')
+        self.assertCountsMatchOrders()
+
+        self.client.post(
+            '/api/orders/bulk/', [order_payload(self.products), order_payload(self.products)],
+            content_type='application/json',
+        )
+        self.assertCountsMatchOrders()
+
+        others[1].delete()
+        Order.objects.filter(status='pending').delete()
+        self.assertCountsMatchOrders()
+
+    def test_reconcile_command_fixes_drift(self):
+        make_order(status='ready')
+        OrderStatusCount.objects.filter(status='ready').update(count=7)
+
+        call_command('reconcile_order_status_counts', stdout=StringIO())
+        self.assertCountsMatchOrders()
+
+
+class DashboardStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        OrderStatusCount.objects.rebuild()
+
+    def test_today_figures_only_count_today_and_status_counts_span_history(self):
+        day_start = dashboard.today_start()
+        make_order(total_amount=30000)
+        make_order(total_amount=20000, status='cancelled')
+        old = make_order(total_amount=50000, status='delivered')
+        Order.objects.filter(pk=old.pk).update(created_at=day_start - timedelta(days=3))
+
+        with assert_query_budget(3):
+            stats = dashboard.compute_dashboard_stats(day_start)
+
+        self.assertEqual(stats['total_orders'], 3)
+        self.assertEqual(stats['today_orders'], 2)
+        self.assertEqual(stats['today_revenue'], 30000)
+        self.assertEqual(stats['orders_by_status']['delivered'], 1)
+        self.assertEqual(stats['delivered_orders'], 1)
+        self.assertEqual(sum(stats['orders_per_hour']), 2)
+
+    def test_order_aggregate_reads_only_the_day(self):
+        with CaptureQueriesContext(connection) as queries:
+            dashboard.order_aggregates(dashboard.today_start())
+
+        sql, = [query['sql'] for query in queries]
+        self.assertIn('WHERE', sql)
+        self.assertIn('"created_at" >=', sql)
+
+
+@override_settings(ORDER_TOMBSTONE_TTL=60)
+class OrderSyncTests(TestCase):
+    def sync(self, cursor=''):
+        return self.client.get('/api/orders/sync/', {'updated_since': cursor}).json()
+
+    def test_idle_tombstone_stream_keeps_its_cursor_alive(self):
+        make_order()
+        start = timezone.now()
+        body = self.sync()
+        self.assertEqual(len(body['orders']), 1)
+
+        # Polled every 40s for longer than the TTL, with no deletion in between
+        for seconds in [40, 80, 120]:
+            with mock.patch('orders.sync.timezone.now', return_value=start + timedelta(seconds=seconds)):
+                body = self.sync(body['cursor'])
+            self.assertFalse(body['reset'])
+            self.assertEqual(body['deleted'], [])
+
+        OrderTombstone.objects.create(order_id=42, deleted_at=start + timedelta(seconds=130))
+        with mock.patch('orders.sync.timezone.now', return_value=start + timedelta(seconds=140)):
+            body = self.sync(body['cursor'])
+        self.assertFalse(body['reset'])
+        self.assertEqual(body['deleted'], [42])
+
+
+class SalesRollupAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_orders(60, available_products(5))
+        start = timezone.now() - timedelta(days=1)
+        cls.rows = list(rollups.sold_items(start, start + timedelta(days=2)))
+
+    def test_python_totals_match_the_order_items(self):
+        totals = rollups.aggregate(self.rows, use_numpy=False)
+
+        items = OrderItem.objects.exclude(order__status__in=dashboard.REVENUE_EXCLUDED_STATUSES)
+        self.assertEqual(sum(quantity for quantity, _ in totals.values()), sum(item.quantity for item in items))
+        self.assertEqual(
+            sum(revenue for _, revenue in totals.values()), sum(item.quantity * item.price for item in items),
+        )
+
+    @skipUnless(rollups.numpy, 'NumPy is not installed')
+    def test_numpy_and_python_totals_are_identical(self):
+        # Small chunks, so the same key is merged across chunks too
+        with mock.patch.object(rollups, 'CHUNK_SIZE', 7):
+            self.assertEqual(
+                rollups.aggregate(self.rows, use_numpy=True), rollups.aggregate(self.rows, use_numpy=False),
+            )
+
+
+class SalesRollupRefreshTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product, = available_products(1)
+
+    def place_order(self, created_at, updated_at, quantity=1):
+        order = make_order(status='delivered')
+        OrderItem.for_product(self.product, quantity, order=order).save()
+        Order.objects.filter(pk=order.pk).update(created_at=created_at, updated_at=updated_at)
+        order.refresh_from_db()
+        return order
+
+    def hourly_quantities(self):
+        return dict(HourlySales.objects.values_list('hour', 'quantity'))
+
+    def refresh_at(self, now, *args):
+        with mock.patch('orders.rollups.timezone.now', return_value=now):
+            call_command('refresh_sales_rollups', '--no-numpy', *args, stdout=StringIO())
+
+    def test_refresh_recomputes_only_changed_hours(self):
+        now = timezone.now()
+        base = rollups.floor_hour(now) - timedelta(hours=10)
+        hours = [base + timedelta(hours=offset) for offset in (1, 3, 4)]
+        loaded = now - timedelta(hours=2)
+        self.place_order(hours[0] + timedelta(minutes=10), loaded)
+        deleted = self.place_order(hours[1] + timedelta(minutes=5), loaded, quantity=2)
+        self.place_order(hours[2] + timedelta(minutes=5), loaded, quantity=3)
+
+        # First run: no watermark yet, so everything is computed
+        self.refresh_at(now - timedelta(hours=1))
+        self.assertEqual(self.hourly_quantities(), {hours[0]: 1, hours[1]: 2, hours[2]: 3})
+        self.assertEqual(rollups.get_watermark(), now - timedelta(hours=1, seconds=rollups.SETTLE_SECONDS))
+
+        # A stale figure in an unchanged hour shows which hours were recomputed
+        HourlySales.objects.filter(hour=hours[2]).update(quantity=99)
+        self.place_order(hours[0] + timedelta(minutes=20), now - timedelta(minutes=30), quantity=4)
+        deleted.delete()
+        with mock.patch('orders.rollups.timezone.now', return_value=now + timedelta(minutes=1)):
+            result = rollups.refresh(use_numpy=False)
+
+        self.assertEqual((result.rebuilt, result.hours), (False, 2))
+        self.assertEqual(self.hourly_quantities(), {hours[0]: 5, hours[2]: 99})
+
+        # Nothing changed since: nothing is recomputed
+        with mock.patch('orders.rollups.timezone.now', return_value=now + timedelta(minutes=2)):
+            self.assertEqual(rollups.refresh(use_numpy=False).hours, 0)
+
+        self.refresh_at(now + timedelta(minutes=3), '--rebuild')
+        self.assertEqual(self.hourly_quantities(), {hours[0]: 5, hours[2]: 3})
+
+
+@override_settings(HOT_PRODUCTS_AUTO=False)
+class KitchenQueueTests(TransactionTestCase):
+    # Real commits: the queue is updated by the order signals' commit hooks
+    def setUp(self):
+        self.queue = kitchen.KitchenQueue(default_seconds_per_item=60)
+        patcher = mock.patch.object(kitchen, 'queue', self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.product, = available_products(1)
+
+    def place_order(self, status, cups=1, **fields):
+        order = make_order(status=status)
+        OrderItem.for_product(self.product, cups, order=order).save()
+        if fields:
+            Order.objects.filter(pk=order.pk).update(**fields)
+        return order
+
+    def queued_ids(self):
+        return [entry.id for entry in self.queue.snapshot().entries]
+
+    def test_preparing_orders_come_first_then_by_created_at(self):
+        now = timezone.now()
+        older = self.place_order('confirmed', created_at=now - timedelta(minutes=10))
+        preparing = self.place_order('preparing', created_at=now - timedelta(minutes=5))
+        newer = self.place_order('confirmed', created_at=now - timedelta(minutes=1))
+        self.place_order('pending')
+        self.assertEqual(self.queued_ids(), [preparing.pk, older.pk, newer.pk])
+
+        # Moves ahead of the waiting orders once a barista picks it up
+        transition([newer.pk], 'preparing')
+        self.assertEqual(self.queued_ids(), [preparing.pk, newer.pk, older.pk])
+
+    def test_eta_follows_the_throughput_of_merged_busy_intervals(self):
+        now = timezone.now()
+        start = now - timedelta(hours=1)
+        # Two overlapping preparations (0-10 and 5-15 min) and a later one
+        # (30-40 min): 25 busy minutes for 5 cups
+        for offset, cups in [(0, 2), (5, 2), (30, 1)]:
+            self.place_order(
+                'delivered', cups, preparing_at=start + timedelta(minutes=offset),
+                ready_at=start + timedelta(minutes=offset + 10),
+            )
+        first = self.place_order('confirmed', 2, created_at=now - timedelta(minutes=2))
+        second = self.place_order('confirmed', 1, created_at=now - timedelta(minutes=1))
+
+        with mock.patch('orders.kitchen.timezone.now', return_value=now):
+            snapshot = self.queue.snapshot()
+        self.assertEqual(snapshot.seconds_per_item, 300)
+        self.assertEqual(snapshot.by_id[first.pk].eta, now + timedelta(minutes=10))
+        self.assertEqual(snapshot.by_id[second.pk].eta, now + timedelta(minutes=15))
+
+    def test_orders_leave_the_queue_when_deleted_or_past_ready(self):
+        ready, deleted, stays = (self.place_order('preparing') for _ in range(3))
+        self.assertEqual(len(self.queued_ids()), 3)
+
+        transition([ready.pk], 'ready')
+        deleted.delete()
+        self.assertEqual(self.queued_ids(), [stays.pk])
+        self.assertIsNone(self.queue.entry(ready.pk))
+
+
+class OrderEventsTests(TestCase):
+    def setUp(self):
+        self.bus = events.EventBus(backlog=3)
+        patcher = mock.patch.object(events, 'bus', self.bus)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def poll(self, cursor=''):
+        response = self.client.get('/api/orders/events/', {'cursor': cursor, 'timeout': 0})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response.json()
+
+    def publish(self, *order_ids):
+        for order_id in order_ids:
+            events.publish_status_changed(order_id, 'confirmed', timezone.now())
+
+    def test_long_poll_delivers_events_after_the_cursor(self):
+        start = self.poll()
+        self.assertEqual((start['events'], start['reset']), ([], False))
+
+        self.publish(1, 2)
+        body = self.poll(start['cursor'])
+        self.assertFalse(body['reset'])
+        self.assertEqual([event['data']['id'] for event in body['events']], [1, 2])
+        self.assertEqual(body['cursor'], body['events'][-1]['id'])
+
+        self.publish(3)
+        body = self.poll(body['cursor'])
+        self.assertEqual([event['data']['id'] for event in body['events']], [3])
+        self.assertEqual(self.poll(body['cursor'])['events'], [])
+
+    def test_cursor_outside_the_buffer_is_reset(self):
+        cursor = self.poll()['cursor']
+        self.publish(1, 2, 3, 4)
+        self.assertEqual(self.poll(cursor), {'cursor': self.bus.cursor(4), 'events': [], 'reset': True})
+        # Another process, or a cursor from before a restart
+        self.assertTrue(self.poll('0123abcd-1')['reset'])
+
+    @override_settings(ORDER_EVENTS_STREAM_DURATION=0.01)
+    def test_event_stream_is_served_to_sse_clients(self):
+        self.publish(1)
+        response = self.client.get(
+            '/api/orders/events/', HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=self.bus.cursor(0),
+        )
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        body = response.getvalue().decode()
+        self.assertTrue(body.startswith('retry: '))
+        self.assertIn(f'id: {self.bus.cursor(1)}\nevent: {events.ORDER_STATUS_CHANGED}\n', body)
+
+        # Without Last-Event-ID the stream starts at the current position
+        response = self.client.get('/api/orders/events/', HTTP_ACCEPT='text/event-stream')
+        self.assertIn(f'id: {self.bus.cursor(1)}\nevent: {events.READY}\n', response.getvalue().decode())
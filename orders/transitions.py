@@ -0,0 +1,94 @@
+"""
+Máy trạng thái của đơn hàng.
+
+pending → confirmed → preparing → ready → delivered; đơn chưa giao có thể bị
+hủy (cancelled). `delivered` và `cancelled` là trạng thái cuối.
+
+`transition()` khóa các đơn (`SELECT ... FOR UPDATE`) rồi đổi trạng thái của
+nhiều đơn bằng một câu
+`UPDATE ... WHERE id IN (...) AND status IN (<các trạng thái được phép>)`,
+nên hai nhân viên cùng chuyển một đơn không thể đưa nó vào trạng thái sai, và
+bộ đếm `OrderStatusCount` được cập nhật trong cùng transaction.
+`QuerySet.update()` không gửi `post_save`, nên signal `order_status_changed`
+được gửi thay.
+"""
+from collections import Counter, namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import STATUS_TIMESTAMPS, Order, OrderStatusCount
+from .signals import order_status_changed
+
+
+# status -> statuses it may move to
+TRANSITIONS = {
+    'pending': {'confirmed', 'cancelled'},
+    'confirmed': {'preparing', 'cancelled'},
+    'preparing': {'ready', 'cancelled'},
+    'ready': {'delivered', 'cancelled'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+# Per-order outcome of `transition()`
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+REJECTED = 'rejected'
+NOT_FOUND = 'not_found'
+
+TransitionResult = namedtuple('TransitionResult', ['id', 'result', 'status', 'updated_at'])
+
+
+def sources(target):
+    """Các trạng thái có thể chuyển sang `target`"""
+    return sorted(status for status, targets in TRANSITIONS.items() if target in targets)
+
+
+def can_transition(current, target):
+    return target in TRANSITIONS.get(current, ())
+
+
+def transition(order_ids, target, user=None):
+    """
+    Chuyển các đơn `order_ids` sang `target` nếu hợp lệ; trả về một
+    `TransitionResult` cho mỗi id, theo thứ tự gửi lên
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    now = timezone.now()
+    changes = {'status': target, 'updated_at': now}
+    if target in STATUS_TIMESTAMPS:
+        changes[STATUS_TIMESTAMPS[target]] = now
+    if user is not None and user.is_authenticated:
+        changes['processed_by'] = user
+
+    with transaction.atomic():
+        # Locked, so the statuses read here are the ones the UPDATE replaces.
+        current = {
+            row['id']: row
+            for row in Order.objects.select_for_update().filter(pk__in=order_ids).values('id', 'status', 'updated_at')
+        }
+        allowed = [row for row in current.values() if can_transition(row['status'], target)]
+        if allowed:
+            Order.objects.filter(pk__in=[row['id'] for row in allowed], status__in=sources(target)).update(**changes)
+            deltas = Counter(row['status'] for row in allowed)
+            deltas = {status: -count for status, count in deltas.items()}
+            deltas[target] = len(allowed)
+            OrderStatusCount.objects.apply(deltas)
+
+    results = []
+    for order_id in order_ids:
+        row = current.get(order_id)
+        if row is None:
+            results.append(TransitionResult(order_id, NOT_FOUND, None, None))
+        elif can_transition(row['status'], target):
+            results.append(TransitionResult(order_id, UPDATED, target, now))
+        elif row['status'] == target:
+            results.append(TransitionResult(order_id, UNCHANGED, target, row['updated_at']))
+        else:
+            results.append(TransitionResult(order_id, REJECTED, row['status'], row['updated_at']))
+
+    updated_ids = [result.id for result in results if result.result == UPDATED]
+    if updated_ids:
+        order_status_changed.send(sender=Order, order_ids=updated_ids, status=target, updated_at=now)
+    return results
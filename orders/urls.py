@@ -5,6 +5,13 @@ urlpatterns = [
     path('', views.OrderListView.as_view(), name='order-list'),
     path('<int:pk>/', views.OrderDetailView.as_view(), name='order-detail'),
     path('create/', views.CreateOrderView.as_view(), name='create-order'),
+    path('sync/', views.OrderSyncView.as_view(), name='order-sync'),
+    path('bulk/', views.BulkCreateOrderView.as_view(), name='bulk-create-orders'),
     path('<int:order_id>/status/', views.update_order_status, name='update-order-status'),
+    path('status/', views.BulkOrderStatusView.as_view(), name='bulk-order-status'),
     path('stats/', views.order_stats, name='order-stats'),
+    path('dashboard/', views.dashboard_stats, name='dashboard-stats'),
+    path('events/', views.order_events, name='order-events'),
+    path('kitchen/', views.KitchenQueueView.as_view(), name='kitchen-queue'),
+    path('reports/sales/', views.SalesReportView.as_view(), name='sales-report'),
 ]
@@ -1,76 +1,296 @@
+from collections import Counter
+
 from rest_framework import generics, status
 from rest_framework.decorators import api_view
+from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import Q
+from django.conf import settings
+from django.db.models import Prefetch
+from django_filters.rest_framework import DjangoFilterBackend
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
 from django.utils.decorators import method_decorator
+from trasua_project.query_budget import query_budget
+from products.pagination import KeysetPagination
+from . import events, kitchen, rollups, sync, transitions
+from .dashboard import get_dashboard_stats
+from .filters import OrderFilter
+from .idempotency import ORDER_CREATE_SCOPE, IdempotencyKeyError, idempotent
+from .intake import MAX_BATCH_SIZE, create_orders
 from .models import Order, OrderItem
-from .serializers import OrderSerializer, CreateOrderSerializer
+from .serializers import (
+    CompactOrderSerializer, OrderSerializer, CreateOrderSerializer, KitchenQueueEntrySerializer,
+    OrderStatusTransitionSerializer, SalesReportQuerySerializer, TransitionResultSerializer,
+)
+from .transitions import transition
+
 
+class OrderItemsMixin:
+    """`?items=compact`: mỗi dòng chỉ có id, tên, size, ảnh sản phẩm (đọc từ bản chụp)"""
 
-class OrderListView(generics.ListAPIView):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
-    ordering = ['-created_at']
+
+    def use_compact_items(self):
+        return self.request.query_params.get('items') == 'compact'
+
+    def get_queryset(self):
+        # Items come in one extra query, whatever the page size; compact items
+        # are read from the snapshot columns without joining the catalog.
+        if self.use_compact_items():
+            return super().get_queryset().prefetch_related('items')
+        return super().get_queryset().prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product__category'))
+        )
+
+    def get_serializer_class(self):
+        if self.use_compact_items():
+            return CompactOrderSerializer
+        return super().get_serializer_class()
+
+
+class OrderListView(OrderItemsMixin, generics.ListAPIView):
+    """Danh sách đơn hàng, luôn phân trang (mặc định 24 đơn, `page_size` tối đa 100)"""
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = OrderFilter
+    pagination_class = KeysetPagination
+    # One page of orders and its items
+    query_budget = 2
+
+
+class OrderSyncView(OrderItemsMixin, generics.GenericAPIView):
+    """Các đơn hàng thay đổi và bị xóa sau cursor `updated_since` (xem orders/sync.py)"""
+    # Orders, their items, tombstones
+    query_budget = 3
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            limit = min(max(int(params.get('limit', sync.DEFAULT_LIMIT)), 1), sync.MAX_LIMIT)
+        except ValueError:
+            limit = sync.DEFAULT_LIMIT
+        try:
+            cursor = sync.decode_cursor(params['updated_since']) if params.get('updated_since') else None
+        except sync.SyncCursorError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = sync.changes(self.get_queryset(), cursor, limit)
+        return Response({
+            'orders': self.get_serializer(result['orders'], many=True).data,
+            'deleted': result['deleted'],
+            'cursor': sync.encode_cursor(result['cursor']),
+            'has_more': result['has_more'],
+            'reset': result['reset'],
+        })
 
 
 class OrderDetailView(generics.RetrieveAPIView):
-    queryset = Order.objects.all()
+    queryset = Order.objects.prefetch_related('items__product__category')
     serializer_class = OrderSerializer
+    query_budget = 4
 
 
 @method_decorator(csrf_exempt, name='dispatch')
 class CreateOrderView(generics.CreateAPIView):
     serializer_class = CreateOrderSerializer
+    # Idempotency lookup, product lookup, BEGIN, SAVEPOINT, order INSERT,
+    # status counter UPDATE, bulk item INSERT, RELEASE, key INSERT, and a
+    # re-read of the key when a concurrent duplicate won: independent of item
+    # count.
+    query_budget = 10
     
     def create(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
+        try:
+            return idempotent(ORDER_CREATE_SCOPE, request, self.create_order)
+        except IdempotencyKeyError as exc:
+            return Response({'error': str(exc)}, status=exc.status_code)
+
+    def create_order(self):
+        serializer = self.get_serializer(data=self.request.data)
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
         
         # Trả về thông tin đơn hàng đã tạo
         order_serializer = OrderSerializer(order)
-        return Response(order_serializer.data, status=status.HTTP_201_CREATED)
+        return Response(order_serializer.data, status=status.HTTP_201_CREATED), order
+
 
+@method_decorator(csrf_exempt, name='dispatch')
+class BulkCreateOrderView(APIView):
+    """API endpoint nhận nhiều đơn hàng một lúc (máy POS/kiosk)"""
+    # Product lookup, key lookup, expired key cleanup, BEGIN, a few batched
+    # INSERTs for orders, items and keys, and one status counter UPDATE.
+    query_budget = 11
+
+    def post(self, request):
+        payloads = request.data
+        if not isinstance(payloads, list) or not payloads:
+            return Response(
+                {'error': 'Dữ liệu phải là một mảng đơn hàng.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(payloads) > MAX_BATCH_SIZE:
+            return Response(
+                {'error': f'Mỗi lô có tối đa {MAX_BATCH_SIZE} đơn hàng.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = create_orders(payloads)
+        summary = Counter(result['status'] for result in results)
+        return Response({
+            'created': summary['created'],
+            'replayed': summary['replayed'],
+            'invalid': summary['invalid'],
+            'results': results,
+        })
 
+
+@query_budget(3)
 @api_view(['GET'])
 def order_stats(request):
     """API endpoint để lấy thống kê đơn hàng"""
-    total_orders = Order.objects.count()
-    pending_orders = Order.objects.filter(status='pending').count()
-    confirmed_orders = Order.objects.filter(status='confirmed').count()
-    delivered_orders = Order.objects.filter(status='delivered').count()
-    
+    stats = get_dashboard_stats()
     return Response({
-        'total_orders': total_orders,
-        'pending_orders': pending_orders,
-        'confirmed_orders': confirmed_orders,
-        'delivered_orders': delivered_orders
+        'total_orders': stats['total_orders'],
+        'pending_orders': stats['pending_orders'],
+        'confirmed_orders': stats['confirmed_orders'],
+        'delivered_orders': stats['delivered_orders']
     })
 
 
+@query_budget(3)
+@api_view(['GET'])
+def dashboard_stats(request):
+    """API endpoint để lấy toàn bộ thống kê cho bảng điều khiển admin"""
+    response = Response(get_dashboard_stats())
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@query_budget(0)
+@require_GET
+def order_events(request):
+    """
+    Sự kiện đơn hàng mới / đổi trạng thái: Server-Sent Events khi client nhận
+    `text/event-stream`, ngược lại long-poll trả về JSON
+    """
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('cursor')
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        duration = getattr(settings, 'ORDER_EVENTS_STREAM_DURATION', events.DEFAULT_STREAM_DURATION)
+        response = StreamingHttpResponse(
+            events.event_stream(cursor, duration), content_type='text/event-stream',
+        )
+        patch_cache_control(response, no_cache=True)
+        # Stop reverse proxies from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    try:
+        timeout = float(request.GET.get('timeout', events.DEFAULT_LONG_POLL_TIMEOUT))
+    except ValueError:
+        timeout = events.DEFAULT_LONG_POLL_TIMEOUT
+    timeout = min(max(timeout, 0), events.DEFAULT_LONG_POLL_TIMEOUT)
+    response = JsonResponse(events.long_poll(cursor, timeout), json_dumps_params={'ensure_ascii': False})
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@query_budget(4)
 @api_view(['PATCH'])
 @csrf_exempt
 def update_order_status(request, order_id):
     """API endpoint để cập nhật trạng thái đơn hàng"""
-    try:
-        order = Order.objects.get(id=order_id)
-        new_status = request.data.get('status')
-        
-        if new_status not in dict(Order.STATUS_CHOICES):
-            return Response(
-                {'error': 'Trạng thái không hợp lệ'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        order.status = new_status
-        order.save()
-        
-        serializer = OrderSerializer(order)
-        return Response(serializer.data)
-        
-    except Order.DoesNotExist:
+    new_status = request.data.get('status')
+    if new_status not in dict(Order.STATUS_CHOICES):
+        return Response(
+            {'error': 'Trạng thái không hợp lệ'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    result, = transition([order_id], new_status, request.user)
+    if result.result == transitions.NOT_FOUND:
         return Response(
             {'error': 'Đơn hàng không tồn tại'}, 
             status=status.HTTP_404_NOT_FOUND
-        )
\ No newline at end of file
+        )
+    if result.result == transitions.REJECTED:
+        return Response(
+            {'error': f'Không thể chuyển đơn hàng từ "{result.status}" sang "{new_status}"'},
+            status=status.HTTP_409_CONFLICT
+        )
+    return Response(TransitionResultSerializer(result).data)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BulkOrderStatusView(APIView):
+    """API endpoint chuyển trạng thái nhiều đơn hàng một lúc"""
+    # BEGIN, one locking SELECT, one conditional UPDATE, one status counter UPDATE
+    query_budget = 4
+
+    def post(self, request):
+        serializer = OrderStatusTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = transition(
+            serializer.validated_data['order_ids'], serializer.validated_data['status'], request.user,
+        )
+        summary = Counter(result.result for result in results)
+        return Response({
+            'updated': summary[transitions.UPDATED],
+            'unchanged': summary[transitions.UNCHANGED],
+            'rejected': summary[transitions.REJECTED],
+            'not_found': summary[transitions.NOT_FOUND],
+            'results': TransitionResultSerializer(results, many=True).data,
+        })
+
+
+class KitchenQueueView(APIView):
+    """API endpoint cho màn hình bếp: các đơn chờ pha chế theo thứ tự, kèm thời gian dự kiến"""
+    # Only the first call after a restart reads the database (open orders,
+    # recent preparation timings); later calls are served from memory.
+    query_budget = 2
+
+    def get(self, request):
+        snapshot = kitchen.queue.snapshot()
+        return Response({
+            'seconds_per_item': round(snapshot.seconds_per_item),
+            'generated_at': snapshot.built_at,
+            'orders': KitchenQueueEntrySerializer(snapshot.entries, many=True).data,
+        })
+
+
+class SalesReportView(APIView):
+    """API endpoint báo cáo doanh số, đọc từ các bảng rollup (lệnh `refresh_sales_rollups`)"""
+    # The rollup rows and the watermark; never the order tables
+    query_budget = 2
+
+    def get(self, request):
+        serializer = SalesReportQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        rows = rollups.sales_report(params['granularity'], params['group_by'], params['date_from'], params['date_to'])
+        return Response({
+            'granularity': params['granularity'],
+            'group_by': params['group_by'],
+            'date_from': params['date_from'],
+            'date_to': params['date_to'],
+            # Orders changed after this are not in the report yet
+            'refreshed_until': rollups.get_watermark(),
+            'totals': {
+                'quantity': sum(row['quantity_sum'] for row in rows),
+                'revenue': sum(int(row['revenue_sum']) for row in rows),
+            },
+            'rows': [
+                {
+                    'period': (
+                        timezone.localtime(row['hour']) if params['granularity'] == 'hour' else row['day']
+                    ),
+                    **{column: row[column] for column in rollups.REPORT_GROUPS[params['group_by']]},
+                    'quantity': row['quantity_sum'],
+                    'revenue': int(row['revenue_sum']),
+                }
+                for row in rows
+            ],
+        })
@@ -4,7 +4,7 @@ from .models import Category, Product, Banner
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'description', 'created_at']
+    list_display = ['name', 'description', 'product_count', 'available_product_count', 'created_at']
     list_filter = ['created_at']
     search_fields = ['name', 'description']
     ordering = ['name']
@@ -0,0 +1,61 @@
+"""Tiện ích dùng chung cho các lệnh benchmark (dữ liệu giả, đo thời gian)."""
+import random
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import Category, Product
+
+
+PRICES = [Decimal(price) for price in range(18000, 60000, 1000)]
+SIZES = [code for code, _ in Product.SIZE_CHOICES]
+STATUSES = [code for code, _ in Product.STATUS_CHOICES]
+
+
+@contextmanager
+def rollback():
+    """Chạy benchmark trong một transaction và hủy mọi thay đổi khi kết thúc"""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def seed_products(count, seed=0):
+    """Tạo `count` sản phẩm giả (bulk_create, không gửi signal) và trả về queryset của chúng"""
+    rng = random.Random(seed)
+    categories = [
+        Category.objects.create(name=f'Benchmark {index}', description='benchmark')
+        for index in range(8)
+    ]
+    products = []
+    for index in range(count):
+        price = rng.choice(PRICES)
+        status = rng.choice(STATUSES)
+        discount = rng.choice([0, 10, 20]) if status == 'sale' else 0
+        products.append(Product(
+            name=f'Trà sữa benchmark {index}',
+            description='Trà sữa thơm ngon với trân châu đen dai giòn, hương vị truyền thống',
+            category=rng.choice(categories),
+            price=price,
+            original_price=price + 5000 if discount else None,
+            discount_percentage=discount,
+            size=rng.choice(SIZES),
+            image=f'products/benchmark-{index % 50}.jpg',
+            is_featured=rng.random() < 0.2,
+            status=status,
+        ))
+    created = Product.objects.bulk_create(products, batch_size=500)
+    return Product.objects.filter(pk__in=[product.pk for product in created])
+
+
+def best_of(func, repeat=3):
+    """Thời gian nhanh nhất (giây) của `repeat` lần chạy và kết quả của lần chạy cuối"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
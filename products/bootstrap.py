@@ -0,0 +1,101 @@
+"""
+Payload khởi động cho storefront: sản phẩm, banner và danh mục trong một
+response duy nhất.
+
+Payload được dựng lại chỉ khi `catalog_fingerprint()` thay đổi và giữ sẵn
+trong bộ nhớ ở dạng đã nén (gzip, và brotli nếu có cài package `brotli`),
+nên mỗi request chỉ cần chọn bản phù hợp với `Accept-Encoding`.
+Dữ liệu có cùng dạng với `ProductSerializer`, `BannerSerializer` và
+`CategorySerializer`; URL ảnh là đường dẫn tương đối vì payload dùng chung
+cho mọi host.
+"""
+import gzip
+import threading
+
+from rest_framework.renderers import JSONRenderer
+
+from .catalog import catalog_fingerprint
+from .models import Banner, Category, Product
+from .projections import ProductProjection
+from .serializers import BannerSerializer, CategorySerializer
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+class Bundle:
+    """Một phiên bản của payload, đã mã hóa sẵn theo từng content-coding"""
+
+    def __init__(self, version, body):
+        self.version = version
+        # Weak: the same validator covers every content-coding of the payload.
+        self.etag = f'W/"{version}"'
+        self.encodings = {'identity': body, 'gzip': gzip.compress(body, GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            self.encodings['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+_bundle = None
+_lock = threading.Lock()
+
+
+def build_payload():
+    """Dữ liệu storefront, cùng queryset và thứ tự với các endpoint danh sách"""
+    projection = ProductProjection()
+    products = Product.objects.filter(is_available=True).order_by('-created_at', 'id')
+    return {
+        'products': projection.serialize(projection.values(products)),
+        'banners': BannerSerializer(Banner.objects.filter(is_active=True), many=True).data,
+        'categories': CategorySerializer(Category.objects.all(), many=True).data,
+    }
+
+
+def get_bundle():
+    """Bundle hiện tại; chỉ dựng lại khi catalog đã thay đổi"""
+    global _bundle
+    version = catalog_fingerprint()
+    bundle = _bundle
+    if bundle is not None and bundle.version == version:
+        return bundle
+    with _lock:
+        if _bundle is None or _bundle.version != version:
+            _bundle = Bundle(version, JSONRenderer().render(build_payload()))
+        return _bundle
+
+
+def parse_accept_encoding(header):
+    """{coding: q} từ header Accept-Encoding"""
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def negotiate_encoding(header, available):
+    """Chọn content-coding tốt nhất trong `available` (ưu tiên br, rồi gzip)"""
+    codings = parse_accept_encoding(header or '')
+    wildcard = codings.get('*', 0.0)
+    best, best_q = 'identity', 0.0
+    for coding in ('br', 'gzip'):
+        q = codings.get(coding, wildcard)
+        if coding in available and q > best_q:
+            best, best_q = coding, q
+    return best
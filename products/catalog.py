@@ -0,0 +1,113 @@
+"""
+Trạng thái thay đổi của catalog (sản phẩm, danh mục, banner).
+
+Mỗi bảng catalog được tóm tắt bằng một truy vấn aggregate (updated_at lớn
+nhất, số dòng) mà không phải tải queryset. Giá trị này dùng làm validator
+cho conditional GET (ETag / Last-Modified / 304).
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .models import Category, Product, Banner
+
+
+CATALOG_TABLES = {
+    'products': Product,
+    'categories': Category,
+    'banners': Banner,
+}
+
+# Representation of a resource also depends on rows of other tables:
+# products carry `category_name`, categories carry `product_count`.
+RESOURCE_TABLES = {
+    'products': ('products', 'categories'),
+    'categories': ('categories', 'products'),
+    'banners': ('banners',),
+}
+
+
+def table_state(table):
+    """Trả về (updated_at lớn nhất, số dòng) của một bảng catalog"""
+    state = CATALOG_TABLES[table].objects.aggregate(
+        last_modified=Max('updated_at'),
+        count=Count('pk'),
+    )
+    return state['last_modified'], state['count']
+
+
+def catalog_state(*tables):
+    """Trạng thái của nhiều bảng catalog, mỗi bảng một truy vấn aggregate"""
+    return {table: table_state(table) for table in tables}
+
+
+def _digest(*parts):
+    raw = '|'.join(str(part) for part in parts)
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def catalog_fingerprint(*tables):
+    """Chuỗi đại diện cho phiên bản hiện tại của các bảng catalog"""
+    states = catalog_state(*(tables or CATALOG_TABLES))
+    return _digest(*(
+        f"{table}:{last.isoformat() if last else '-'}:{count}"
+        for table, (last, count) in sorted(states.items())
+    ))
+
+
+def _resource_validators(resource, request, pk=None):
+    if pk is not None:
+        # Detail views only depend on one product and its category.
+        row = (
+            Product.objects.filter(pk=pk, is_available=True)
+            .values_list('updated_at', 'category__updated_at')
+            .first()
+        )
+        if row is None:
+            return None, None
+        last_modified = max(row)
+        state = row
+    else:
+        states = catalog_state(*RESOURCE_TABLES[resource])
+        last_modified = max((last for last, _ in states.values() if last), default=None)
+        state = sorted(states.items())
+
+    etag = _digest(
+        resource, state, request.get_full_path(), request.META.get('HTTP_ACCEPT', ''),
+    )
+    return etag, last_modified
+
+
+def conditional_catalog(resource):
+    """
+    Decorator cho các view GET của catalog: trả về 304 Not Modified khi
+    client đã có phiên bản mới nhất, không serialize lại danh sách.
+    """
+    def get_validators(request, *args, **kwargs):
+        validators = getattr(request, '_catalog_validators', None)
+        if validators is None:
+            validators = _resource_validators(resource, request, kwargs.get('pk'))
+            request._catalog_validators = validators
+        return validators
+
+    def etag_func(request, *args, **kwargs):
+        return get_validators(request, *args, **kwargs)[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        return get_validators(request, *args, **kwargs)[1]
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func, last_modified_func)(view_func)
+
+        @wraps(view_func)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Let browsers keep the body but revalidate on every load.
+            patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ['Accept'])
+            return response
+        return inner
+    return decorator
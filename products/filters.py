@@ -0,0 +1,30 @@
+from django.db.models import Case, IntegerField, When
+from rest_framework import filters
+
+from .search import get_search_backend
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Tham số `?search=` dùng chỉ mục full-text (không phân biệt dấu, khớp
+    tiền tố). Khi client không gửi `ordering`, kết quả xếp theo mức độ
+    liên quan.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+
+        product_ids = get_search_backend().search(query)
+        if not product_ids:
+            return queryset.none()
+
+        queryset = queryset.filter(pk__in=product_ids)
+        if filters.OrderingFilter.ordering_param not in request.query_params:
+            rank = Case(
+                *[When(pk=pk, then=position) for position, pk in enumerate(product_ids)],
+                output_field=IntegerField(),
+            )
+            queryset = queryset.order_by(rank)
+        return queryset
@@ -0,0 +1,146 @@
+"""
+Ảnh responsive cho sản phẩm và banner.
+
+Sau khi ảnh gốc được lưu, một worker pool cục bộ (Pillow) tạo các bản thu
+nhỏ WebP/JPEG ở nhiều chiều rộng, ngoài luồng xử lý request. Danh sách bản
+thu nhỏ được ghi vào field `image_variants`:
+
+    {"source": "products/3f/3fa8...c1.jpg", "width": 1200,
+     "webp": [[320, "products/derivatives/9f/9f79...eb.webp"], ...],
+     "jpeg": [[320, "products/derivatives/0c/0c4e...12.jpg"], ...]}
+"""
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger('trasua.images')
+
+DEFAULT_WIDTHS = (320, 640, 960)
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2),
+            thread_name_prefix='image-derivatives',
+        )
+    return _executor
+
+
+def derivative_widths(original_width):
+    """Các chiều rộng cần tạo; không phóng to ảnh nhỏ hơn chiều rộng nhỏ nhất"""
+    widths = [
+        width for width in getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', DEFAULT_WIDTHS)
+        if width < original_width
+    ]
+    return widths or [original_width]
+
+
+def _prepare(image, fmt):
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        if 'A' in image.getbands():
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+    if image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    return image
+
+
+def render_derivatives(storage, name):
+    """Tạo các bản thu nhỏ của ảnh `name` và trả về cấu trúc `image_variants`"""
+    with storage.open(name, 'rb') as source:
+        original = Image.open(source)
+        original.load()
+    original = ImageOps.exif_transpose(original)
+
+    # Derivatives live next to the upload_to directory ("products/derivatives/"),
+    # whatever sub-directories the storage backend adds to the original name.
+    directory = posixpath.join(name.split('/')[0], 'derivatives') if '/' in name else 'derivatives'
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    variants = {'source': name, 'width': original.width}
+
+    for fmt, (pil_format, options) in FORMATS.items():
+        prepared = _prepare(original, fmt)
+        entries = []
+        for width in derivative_widths(original.width):
+            height = max(1, round(original.height * width / original.width))
+            resized = prepared.resize((width, height), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, **options)
+
+            # The storage renames the file after its content hash
+            target = posixpath.join(directory, f'{stem}-{width}w.{EXTENSIONS[fmt]}')
+            entries.append([width, storage.save(target, ContentFile(buffer.getvalue()))])
+        variants[fmt] = entries
+    return variants
+
+
+def needs_derivatives(instance):
+    return bool(instance.image) and instance.image_variants.get('source') != instance.image.name
+
+
+def generate_derivatives(model, pk):
+    """Tạo bản thu nhỏ cho một dòng; bỏ qua nếu ảnh đã bị thay trong lúc xử lý"""
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not instance.image:
+        return None
+    name = instance.image.name
+    variants = render_derivatives(instance.image.storage, name)
+    updated = model.objects.filter(pk=pk, image=name).update(
+        image_variants=variants, updated_at=timezone.now(),
+    )
+    if not updated:
+        # The image was replaced meanwhile; these derivatives are orphans.
+        from .storage import release_blobs
+        release_blobs(name, variants)
+        return None
+    return variants
+
+
+def _run_in_worker(model, pk):
+    close_old_connections()
+    try:
+        generate_derivatives(model, pk)
+    except Exception:
+        logger.exception('Không tạo được ảnh thu nhỏ cho %s #%s', model.__name__, pk)
+    finally:
+        connection.close()
+
+
+def schedule_derivatives(instance):
+    """Xếp hàng tạo bản thu nhỏ sau khi transaction hiện tại commit"""
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: get_executor().submit(_run_in_worker, model, pk))
+
+
+def image_srcset(image_url, image_name, variants):
+    """
+    Cấu trúc dùng trực tiếp cho `<picture>`/`srcset`:
+    {"webp": "url 320w, url 640w", "jpeg": "..."}; None khi chưa có bản thu nhỏ.
+    """
+    if not image_name or not variants or variants.get('source') != image_name:
+        return None
+    return {
+        fmt: ', '.join(f'{image_url(path)} {width}w' for width, path in variants.get(fmt, []))
+        for fmt in FORMATS
+    }
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from products.benchmarking import best_of, rollback, seed_products
+from products.projections import ProductProjection
+from products.serializers import ProductSerializer
+
+
+class Command(BaseCommand):
+    help = 'So sánh tốc độ ProductSerializer và ProductProjection trên dữ liệu giả'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/api/products/products/', HTTP_HOST='127.0.0.1:8000')
+        renderer = JSONRenderer()
+
+        for count in options['rows']:
+            with rollback():
+                queryset = seed_products(count).order_by('-created_at', 'id')
+
+                def serializer_stock():
+                    return ProductSerializer(queryset, many=True, context={'request': request}).data
+
+                def serializer_select_related():
+                    return ProductSerializer(
+                        queryset.select_related('category'), many=True, context={'request': request},
+                    ).data
+
+                def projection():
+                    projector = ProductProjection(request=request)
+                    return projector.serialize(projector.values(queryset))
+
+                timings = {}
+                outputs = {}
+                for label, func in [
+                    ('ProductSerializer', serializer_stock),
+                    ('ProductSerializer + select_related', serializer_select_related),
+                    ('ProductProjection', projection),
+                ]:
+                    timings[label], data = best_of(func, options['repeat'])
+                    outputs[label] = renderer.render(data)
+
+            if len(set(outputs.values())) != 1:
+                raise CommandError(f'{count} dòng: output của ProductProjection khác ProductSerializer')
+
+            baseline = timings['ProductSerializer']
+            self.stdout.write(f'{count} dòng (output giống hệt nhau, {len(outputs["ProductProjection"])} bytes)')
+            for label, seconds in timings.items():
+                self.stdout.write(f'  {label:<36} {seconds * 1000:9.1f} ms  x{baseline / seconds:5.1f}')
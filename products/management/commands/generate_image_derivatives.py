@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from products.images import generate_derivatives, needs_derivatives
+from products.models import Banner, Product
+
+
+MODELS = {'products': Product, 'banners': Banner}
+
+
+def _generate(model, pk):
+    try:
+        return generate_derivatives(model, pk)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Tạo ảnh thu nhỏ WebP/JPEG cho ảnh sản phẩm và banner đã có (chạy song song)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(MODELS), action='append',
+                            help='Chỉ xử lý products hoặc banners (mặc định: cả hai)')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--force', action='store_true',
+                            help='Tạo lại cả những ảnh đã có bản thu nhỏ')
+
+    def handle(self, *args, **options):
+        jobs = []
+        for label in options['model'] or sorted(MODELS):
+            model = MODELS[label]
+            for instance in model.objects.exclude(image='').only('pk', 'image', 'image_variants'):
+                if options['force'] or needs_derivatives(instance):
+                    jobs.append((model, instance.pk))
+
+        if not jobs:
+            self.stdout.write(self.style.SUCCESS('Tất cả ảnh đã có bản thu nhỏ'))
+            return
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {executor.submit(_generate, model, pk): (model, pk) for model, pk in jobs}
+            for future in as_completed(futures):
+                model, pk = futures[future]
+                try:
+                    future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{model.__name__} #{pk}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã xử lý {len(jobs) - failed}/{len(jobs)} ảnh ({options["workers"]} worker)'
+        ))
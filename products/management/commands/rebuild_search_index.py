@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Xây dựng lại chỉ mục tìm kiếm sản phẩm'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã đánh chỉ mục {Product.objects.count()} sản phẩm ({type(backend).__name__})'
+        ))
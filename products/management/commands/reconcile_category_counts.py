@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+
+from products.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Đối soát và sửa bộ đếm sản phẩm của danh mục'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Chỉ báo cáo sai lệch, không ghi vào database',
+        )
+
+    def handle(self, *args, **options):
+        categories = Category.objects.annotate(
+            actual_total=Count('product'),
+            actual_available=Count('product', filter=Q(product__is_available=True)),
+        )
+        drifted = [
+            category for category in categories
+            if (category.product_count, category.available_product_count)
+            != (category.actual_total, category.actual_available)
+        ]
+        for category in drifted:
+            self.stdout.write(
+                f'{category.name}: {category.product_count}/{category.available_product_count}'
+                f' -> {category.actual_total}/{category.actual_available}'
+            )
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Bộ đếm sản phẩm đã chính xác'))
+            return
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} danh mục bị sai lệch'))
+            return
+
+        Category.objects.filter(pk__in=[category.pk for category in drifted]).refresh_product_counts()
+        self.stdout.write(self.style.SUCCESS(f'Đã sửa {len(drifted)} danh mục'))
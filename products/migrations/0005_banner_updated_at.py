@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_category_is_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banner',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
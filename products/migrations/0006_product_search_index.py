@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:05
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from products.search import SQLiteFTSBackend, product_document
+
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Product = apps.get_model('products', 'Product')
+    with schema_editor.connection.cursor() as cursor:
+        SQLiteFTSBackend.create_table(cursor)
+        cursor.executemany(
+            f'INSERT INTO {SQLiteFTSBackend.table} (rowid, name, description, category) '
+            f'VALUES (%s, %s, %s, %s)',
+            [
+                (product.pk, *product_document(product))
+                for product in Product.objects.select_related('category')
+            ],
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    from products.search import SQLiteFTSBackend
+
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        SQLiteFTSBackend.drop_table(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_banner_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
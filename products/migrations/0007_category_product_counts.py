@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:20
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_product_counts(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    categories = Category.objects.annotate(
+        total=Count('product'),
+        available=Count('product', filter=Q(product__is_available=True)),
+    )
+    for category in categories:
+        category.product_count = category.total
+        category.available_product_count = category.available
+    Category.objects.bulk_update(categories, ['product_count', 'available_product_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='available_product_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Số sản phẩm có sẵn'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Số sản phẩm'),
+        ),
+        migrations.RunPython(populate_product_counts, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,39 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Now
 from django.contrib.auth.models import User
 
 
+class CategoryQuerySet(models.QuerySet):
+    def refresh_product_counts(self):
+        """
+        Tính lại bộ đếm sản phẩm của các danh mục bằng một câu UPDATE; đổi cả
+        `updated_at` để ETag/cache của danh mục (catalog_fingerprint) hết hạn
+        """
+        products = Product.objects.filter(category=OuterRef('pk')).order_by().values('category')
+
+        def count_of(queryset):
+            return Coalesce(Subquery(queryset.annotate(count=Count('pk')).values('count')), 0)
+
+        return self.update(
+            product_count=count_of(products),
+            available_product_count=count_of(products.filter(is_available=True)),
+            updated_at=Now(),
+        )
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100, verbose_name="Tên danh mục")
     description = models.TextField(blank=True, verbose_name="Mô tả")
     is_active = models.BooleanField(default=True, verbose_name="Đang hoạt động")
+    # Denormalized counters, maintained by products.signals
+    product_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Số sản phẩm")
+    available_product_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Số sản phẩm có sẵn")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Danh mục"
         verbose_name_plural = "Danh mục"
@@ -38,6 +63,8 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=0, verbose_name="Giá")
     size = models.CharField(max_length=1, choices=SIZE_CHOICES, default='M', verbose_name="Kích thước")
     image = models.ImageField(upload_to='products/', verbose_name="Hình ảnh")
+    # Resized WebP/JPEG copies, filled in by products.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_available = models.BooleanField(default=True, verbose_name="Có sẵn")
     is_featured = models.BooleanField(default=False, verbose_name="Sản phẩm nổi bật")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='', blank=True, verbose_name="Trạng thái")
@@ -50,10 +77,38 @@ class Product(models.Model):
         verbose_name = "Sản phẩm"
         verbose_name_plural = "Sản phẩm"
         ordering = ['-created_at']
+        # Product list / home page, per category, and featured products
+        # (checked by `manage.py index_advisor --check`). Partial indexes:
+        # filter(is_available=True) compiles to a bare `WHERE is_available`,
+        # which SQLite matches against an index condition but not an index column.
+        indexes = [
+            models.Index(
+                fields=['-created_at', 'id'], condition=Q(is_available=True), name='product_available_idx',
+            ),
+            models.Index(
+                fields=['category', '-created_at', 'id'], condition=Q(is_available=True),
+                name='product_category_idx',
+            ),
+            models.Index(
+                fields=['-created_at'], condition=Q(is_available=True, is_featured=True),
+                name='product_featured_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.get_size_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored category so that moving a product refreshes
+        # the counters of both the old and the new category, and the stored
+        # image so that a replaced blob can be released.
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        instance._loaded_image = instance.__dict__.get('image')
+        instance._loaded_image_variants = instance.__dict__.get('image_variants')
+        return instance
+
     @property
     def formatted_price(self):
         return f"{float(self.price):,.0f} VNĐ"
@@ -87,9 +142,11 @@ class Banner(models.Model):
     title = models.CharField(max_length=200, verbose_name="Tiêu đề")
     subtitle = models.CharField(max_length=300, verbose_name="Phụ đề")
     image = models.ImageField(upload_to='banners/', verbose_name="Hình ảnh")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True, verbose_name="Đang hoạt động")
     order = models.PositiveIntegerField(default=0, verbose_name="Thứ tự")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Banner"
@@ -97,4 +154,11 @@ class Banner(models.Model):
         ordering = ['order', '-created_at']
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image = instance.__dict__.get('image')
+        instance._loaded_image_variants = instance.__dict__.get('image_variants')
+        return instance
\ No newline at end of file
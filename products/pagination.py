@@ -0,0 +1,28 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor (keyset) pagination theo `(-created_at, id)`, luôn bật"""
+    ordering = ('-created_at', 'id')
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def is_enabled(self, request):
+        return True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_enabled(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class OptInCursorPagination(KeysetPagination):
+    """
+    Cursor (keyset) pagination chỉ bật khi client gửi `cursor` hoặc
+    `page_size`, để các client cũ vẫn nhận được toàn bộ danh sách.
+    """
+
+    def is_enabled(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
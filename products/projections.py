@@ -0,0 +1,168 @@
+"""
+Projection đọc nhanh cho danh sách sản phẩm.
+
+`ProductProjection` đọc các cột bằng `.values()` (đã join sẵn tên danh mục)
+thay vì dựng model instance cho từng dòng, rồi áp dụng một "plan" các hàm
+chuyển đổi đã được biên dịch sẵn theo thứ tự field của `ProductSerializer`.
+Kết quả phải giống hệt (từng byte sau khi render JSON) với `ProductSerializer`.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework.fields import ISO_8601
+from rest_framework.settings import api_settings
+
+from .images import image_srcset
+from .models import Product
+from .serializers import ProductSerializer
+
+
+COLUMNS = (
+    'id', 'name', 'description', 'category_id', 'category__name',
+    'price', 'original_price', 'discount_percentage', 'size', 'image',
+    'image_variants', 'is_available', 'is_featured', 'status', 'created_at',
+)
+
+STATUS_DISPLAY = dict(Product.STATUS_CHOICES)
+
+
+@lru_cache(maxsize=1024)
+def format_vnd(amount):
+    """Định dạng giống `Product.formatted_price`; menu có ít mức giá nên cache theo giá trị"""
+    return f"{float(amount):,.0f} VNĐ"
+
+
+def _discount_amount(row):
+    original_price = row['original_price']
+    if original_price and int(row['discount_percentage']) > 0:
+        return float(original_price) - float(row['price'])
+    return 0
+
+
+def _formatted_discount_amount(row):
+    amount = _discount_amount(row)
+    if amount > 0:
+        return f"{amount:,.0f} VNĐ"
+    return None
+
+
+def _discount_display(row):
+    if row['status'] == 'sale' and int(row['discount_percentage']) > 0:
+        return f"-{row['discount_percentage']}%"
+    return None
+
+
+def _cached(to_representation):
+    cache = {}
+
+    def convert(value):
+        try:
+            return cache[value]
+        except KeyError:
+            result = cache[value] = to_representation(value)
+            return result
+    return convert
+
+
+class ProductProjection:
+    """Serialize các dòng `.values()` của Product giống hệt `ProductSerializer`"""
+
+    columns = COLUMNS
+
+    def __init__(self, fields=None, request=None):
+        self.request = request
+        serializer_fields = ProductSerializer(context={'request': request}).fields
+        builders = self._converters(serializer_fields)
+        self.plan = tuple(
+            (name, builders[name])
+            for name in ProductSerializer.Meta.fields
+            if not fields or name in fields
+        )
+
+    def _converters(self, serializer_fields):
+        price = _cached(serializer_fields['price'].to_representation)
+        created_at = self._datetime_converter(serializer_fields['created_at'])
+        image_url = self._image_url_converter()
+
+        def optional(convert, column):
+            def converter(row):
+                value = row[column]
+                return None if value is None else convert(value)
+            return converter
+
+        return {
+            'id': lambda row: row['id'],
+            'name': lambda row: row['name'],
+            'description': lambda row: row['description'],
+            'category': lambda row: row['category_id'],
+            'category_name': lambda row: row['category__name'],
+            'price': lambda row: price(row['price']),
+            'formatted_price': lambda row: format_vnd(row['price']),
+            'original_price': optional(price, 'original_price'),
+            'formatted_original_price': lambda row: (
+                format_vnd(row['original_price']) if row['original_price'] else None
+            ),
+            'discount_percentage': lambda row: row['discount_percentage'],
+            'discount_amount': _discount_amount,
+            'formatted_discount_amount': _formatted_discount_amount,
+            'discount_display': _discount_display,
+            'size': lambda row: row['size'],
+            'image': lambda row: image_url(row['image']),
+            'image_srcset': lambda row: image_srcset(image_url, row['image'], row['image_variants']),
+            'is_available': lambda row: row['is_available'],
+            'is_featured': lambda row: row['is_featured'],
+            'status': lambda row: row['status'],
+            'get_status_display': lambda row: STATUS_DISPLAY.get(row['status'], row['status']),
+            'created_at': optional(created_at, 'created_at'),
+        }
+
+    def _datetime_converter(self, field):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if not settings.USE_TZ or output_format is None or output_format.lower() != ISO_8601:
+            return field.to_representation
+
+        # Same as DateTimeField.to_representation, with the timezone resolved once.
+        tz = timezone.get_current_timezone()
+
+        def to_iso(value):
+            value = value.astimezone(tz).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return to_iso
+
+    def _image_url_converter(self):
+        storage = Product._meta.get_field('image').storage
+        request = self.request
+
+        base_url = getattr(storage, 'base_url', None)
+        if isinstance(storage, FileSystemStorage) and base_url and base_url.endswith('/'):
+            # FileSystemStorage.url() joins base_url and the quoted name; resolve
+            # the (absolute) base once instead of per row.
+            prefix = request.build_absolute_uri(base_url) if request is not None else base_url
+
+            def image_url(name):
+                if not name:
+                    return None
+                return prefix + filepath_to_uri(name).lstrip('/')
+            return image_url
+
+        def image_url(name):
+            if not name:
+                return None
+            url = storage.url(name)
+            if request is not None:
+                return request.build_absolute_uri(url)
+            return url
+        return image_url
+
+    def values(self, queryset):
+        """Queryset `.values()` chứa đủ các cột cần cho plan (giữ nguyên filter và ordering)"""
+        return queryset.values(*self.columns)
+
+    def serialize(self, rows):
+        plan = self.plan
+        return [{name: convert(row) for name, convert in plan} for row in rows]
@@ -0,0 +1,151 @@
+"""
+Chỉ mục tìm kiếm full-text cho sản phẩm.
+
+Văn bản được chuẩn hóa bỏ dấu tiếng Việt (`fold_text`) cả khi đánh chỉ mục
+lẫn khi tìm kiếm, nên "tra sua tran chau" khớp với "Trà sữa trân châu".
+Backend được chọn qua setting `PRODUCT_SEARCH_BACKEND`.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+
+DEFAULT_SEARCH_BACKEND = 'products.search.SQLiteFTSBackend'
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def fold_text(text):
+    """Chuyển về chữ thường và bỏ dấu tiếng Việt ("Đường" -> "duong")"""
+    if not text:
+        return ''
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(fold_text(text))
+
+
+def product_document(product):
+    """Các cột được đánh chỉ mục của một sản phẩm: (tên, mô tả, tên danh mục)"""
+    return (
+        fold_text(product.name),
+        fold_text(product.description),
+        fold_text(product.category.name),
+    )
+
+
+class BaseSearchBackend:
+    """Interface chung cho các backend tìm kiếm sản phẩm"""
+
+    def index_products(self, products):
+        raise NotImplementedError
+
+    def remove_products(self, product_ids):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, query, limit=200):
+        """Trả về danh sách id sản phẩm, xếp theo mức độ liên quan giảm dần"""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Chỉ mục SQLite FTS5, bảng ảo `products_search` với rowid = id sản phẩm"""
+
+    table = 'products_search'
+    # bm25 weights for (name, description, category)
+    weights = (10.0, 1.0, 4.0)
+
+    @classmethod
+    def create_table(cls, cursor):
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {cls.table} '
+            f'USING fts5(name, description, category, tokenize="unicode61 remove_diacritics 2")'
+        )
+
+    @classmethod
+    def drop_table(cls, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {cls.table}')
+
+    def index_products(self, products):
+        rows = [(product.pk, *product_document(product)) for product in products]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, name, description, category) '
+                f'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove_products(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in product_ids]
+            )
+
+    def rebuild(self):
+        from .models import Product
+
+        with connection.cursor() as cursor:
+            self.drop_table(cursor)
+            self.create_table(cursor)
+        self.index_products(Product.objects.select_related('category').iterator(chunk_size=500))
+
+    def search(self, query, limit=200):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Every token is quoted (no FTS syntax injection) and prefix-matched.
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, %s, %s, %s) LIMIT %s',
+                [match, *self.weights, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Backend dự phòng cho các database không có FTS: tìm bằng icontains, không xếp hạng"""
+
+    def index_products(self, products):
+        pass
+
+    def remove_products(self, product_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, limit=200):
+        from .models import Product
+
+        condition = Q()
+        for token in query.split():
+            condition &= (
+                Q(name__icontains=token)
+                | Q(description__icontains=token)
+                | Q(category__name__icontains=token)
+            )
+        return list(Product.objects.filter(condition).values_list('pk', flat=True)[:limit])
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    backend_path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', DEFAULT_SEARCH_BACKEND)
+    return import_string(backend_path)()
@@ -1,19 +1,44 @@
 from rest_framework import serializers
+from .images import image_srcset
 from .models import Category, Product, Banner
 
 
+class SparseFieldsMixin:
+    """Cho phép serializer chỉ trả về một phần các field (`fields=[...]`)"""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ImageSrcsetMixin:
+    """`get_image_srcset` cho các serializer có field `image_srcset`"""
+
+    def get_image_srcset(self, obj):
+        request = self.context.get('request')
+        storage = obj.image.storage
+
+        def image_url(name):
+            url = storage.url(name)
+            if request is not None:
+                return request.build_absolute_uri(url)
+            return url
+        return image_srcset(image_url, obj.image.name, obj.image_variants)
+
+
 class CategorySerializer(serializers.ModelSerializer):
-    product_count = serializers.SerializerMethodField()
-    
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description', 'is_active', 'product_count', 'created_at']
-    
-    def get_product_count(self, obj):
-        return obj.product_set.count()
+        fields = [
+            'id', 'name', 'description', 'is_active',
+            'product_count', 'available_product_count', 'created_at'
+        ]
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, ImageSrcsetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     formatted_price = serializers.CharField(read_only=True)
     get_status_display = serializers.CharField(read_only=True)
@@ -21,6 +46,7 @@ class ProductSerializer(serializers.ModelSerializer):
     discount_amount = serializers.ReadOnlyField()
     formatted_discount_amount = serializers.CharField(read_only=True)
     discount_display = serializers.CharField(read_only=True)
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
@@ -28,12 +54,14 @@ class ProductSerializer(serializers.ModelSerializer):
             'id', 'name', 'description', 'category', 'category_name',
             'price', 'formatted_price', 'original_price', 'formatted_original_price',
             'discount_percentage', 'discount_amount', 'formatted_discount_amount',
-            'discount_display', 'size', 'image', 'is_available',
+            'discount_display', 'size', 'image', 'image_srcset', 'is_available',
             'is_featured', 'status', 'get_status_display', 'created_at'
         ]
 
 
-class BannerSerializer(serializers.ModelSerializer):
+class BannerSerializer(ImageSrcsetMixin, serializers.ModelSerializer):
+    image_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = Banner
-        fields = ['id', 'title', 'subtitle', 'image', 'is_active', 'order']
+        fields = ['id', 'title', 'subtitle', 'image', 'image_srcset', 'is_active', 'order']
@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .images import needs_derivatives, schedule_derivatives
+from .models import Banner, Category, Product
+from .search import get_search_backend
+from .storage import release_blobs
+
+
+@receiver(post_save, sender=Product)
+def refresh_category_counts_on_save(sender, instance, raw=False, **kwargs):
+    """Cập nhật bộ đếm sản phẩm của danh mục cũ và mới"""
+    if raw:
+        return
+    category_ids = {instance.category_id, getattr(instance, '_loaded_category_id', None)}
+    category_ids.discard(None)
+    Category.objects.filter(pk__in=category_ids).refresh_product_counts()
+    instance._loaded_category_id = instance.category_id
+
+
+@receiver(post_delete, sender=Product)
+def refresh_category_counts_on_delete(sender, instance, **kwargs):
+    """Cập nhật bộ đếm sản phẩm khi xóa sản phẩm"""
+    Category.objects.filter(pk=instance.category_id).refresh_product_counts()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    """Cập nhật chỉ mục tìm kiếm khi sản phẩm được lưu"""
+    if raw:
+        return
+    get_search_backend().index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    """Xóa sản phẩm khỏi chỉ mục tìm kiếm"""
+    get_search_backend().remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created=False, raw=False, **kwargs):
+    """Tên danh mục nằm trong chỉ mục, nên đánh lại chỉ mục các sản phẩm của danh mục"""
+    if raw or created:
+        return
+    products = Product.objects.filter(category=instance).select_related('category')
+    get_search_backend().index_products(products)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Banner)
+def queue_image_derivatives(sender, instance, raw=False, **kwargs):
+    """Tạo ảnh thu nhỏ (ngoài luồng request) khi ảnh gốc thay đổi"""
+    if raw or not needs_derivatives(instance):
+        return
+    schedule_derivatives(instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Banner)
+def release_replaced_image(sender, instance, raw=False, **kwargs):
+    """Xóa ảnh cũ (nếu không còn dòng nào dùng) khi ảnh được thay"""
+    if raw:
+        return
+    old_name = getattr(instance, '_loaded_image', None)
+    old_variants = getattr(instance, '_loaded_image_variants', None)
+    instance._loaded_image = instance.image.name
+    instance._loaded_image_variants = instance.image_variants
+    if old_name and old_name != instance.image.name:
+        transaction.on_commit(lambda: release_blobs(old_name, old_variants))
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Banner)
+def release_deleted_image(sender, instance, **kwargs):
+    """Xóa ảnh của dòng vừa bị xóa nếu không còn dòng nào dùng"""
+    name, variants = instance.image.name, instance.image_variants
+    transaction.on_commit(lambda: release_blobs(name, variants))
@@ -0,0 +1,99 @@
+"""
+Lưu media theo địa chỉ nội dung (content-addressed).
+
+File được đặt tên theo hash SHA-256 của nội dung, ví dụ
+`products/3f/3fa8...c1.jpg`: hai lần upload giống nhau dùng chung một blob,
+và một tên file không bao giờ đổi nội dung, nên có thể cache vĩnh viễn
+(`Cache-Control: immutable`). Blob không còn dòng nào tham chiếu sẽ bị xóa
+khi sản phẩm/banner được cập nhật hoặc xóa.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.apps import apps
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+
+HASH_LENGTH = 40
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+_HASHED_NAME_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{%d}\.\w+$' % HASH_LENGTH)
+
+# (model label, field) pairs whose values point at blobs in default storage
+MEDIA_REFERENCES = [
+    ('products.Product', 'image'),
+    ('products.Banner', 'image'),
+    # Order history keeps showing the image a product had when it was ordered.
+    ('orders.OrderItem', 'product_image'),
+]
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def is_content_addressed(name):
+    return bool(_HASHED_NAME_RE.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage đặt tên file theo hash nội dung và không lưu trùng"""
+
+    def __init__(self, *args, **kwargs):
+        # The same name always means the same bytes, so overwriting is harmless.
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(*args, **kwargs)
+
+    def hashed_name(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        digest = content_hash(content)
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+def is_referenced(name):
+    for label, field in MEDIA_REFERENCES:
+        if apps.get_model(label)._default_manager.filter(**{field: name}).exists():
+            return True
+    return False
+
+
+def release_blobs(name, variants=None):
+    """Xóa blob `name` (và các ảnh thu nhỏ của nó) nếu không còn dòng nào dùng"""
+    if not name or is_referenced(name):
+        return
+    names = [name]
+    if variants and variants.get('source') == name:
+        for entries in variants.values():
+            if isinstance(entries, list):
+                names.extend(path for _, path in entries)
+    for blob in names:
+        default_storage.delete(blob)
+
+
+def serve_media(request, path, document_root=None):
+    """Phục vụ media; file đặt tên theo hash được cache 1 năm (immutable)"""
+    response = serve(request, path, document_root=document_root)
+    if is_content_addressed(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
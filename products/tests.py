@@ -1,3 +1,275 @@
-from django.test import TestCase
+import gzip
+import json
+from contextlib import redirect_stdout
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from trasua_project.query_budget import QueryBudgetExceeded, assert_query_budget
+from trasua_project.renderers import FastJSONRenderer
+
+from . import bootstrap
+from .benchmarking import seed_products
+from .models import Category, Product
+from .projections import ProductProjection
+from .search import get_search_backend
+from .serializers import ProductSerializer
+from .views import CategoryListView, ProductListView
+
+
+class ReconcileCategoryCountsTests(TestCase):
+    def test_fixes_drifted_counters_and_bumps_updated_at(self):
+        # bulk_create skips the signals, so every counter starts out drifted
+        seed_products(20)
+        stale = timezone.now() - timedelta(days=1)
+        Category.objects.update(updated_at=stale)
+
+        call_command('reconcile_category_counts', stdout=StringIO())
+
+        # Categories left without products were already right and stay untouched
+        for category in Category.objects.filter(product__isnull=False).distinct():
+            self.assertEqual(category.product_count, category.product_set.count())
+            self.assertEqual(category.available_product_count, category.product_set.filter(is_available=True).count())
+            self.assertGreater(category.updated_at, stale)
+
+
+class CatalogConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_products(5)
+        cls.staff = User.objects.create_user('staff', password='secret', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def etag(self, path='/api/products/products/'):
+        response = self.client.get(path)
+        # Unread: closing it stops the query budget recorder
+        response.close()
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def admin(self, method, path, data=None):
+        # The admin product views print the submitted data
+        with redirect_stdout(StringIO()):
+            response = getattr(self.client, method)(path, data, content_type='application/json')
+        self.assertLess(response.status_code, 300)
+        return response
+
+    def test_unchanged_catalog_is_not_modified(self):
+        etag = self.etag()
+        for path in ['/api/products/products/', '/api/products/categories/']:
+            with self.subTest(path=path):
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=self.etag(path))
+                self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.etag(), etag)
+
+    def test_admin_changes_invalidate_the_etag(self):
+        category = Category.objects.first()
+        etags = [self.etag()]
+
+        product_id = self.admin('post', '/api/admin/products/', {
+            'name': 'Trà đào', 'description': 'Trà đào cam sả', 'category_id': category.pk,
+            'price': 30000, 'size': 'M',
+        }).json()['id']
+        etags.append(self.etag())
+
+        self.admin('put', f'/api/admin/products/{product_id}/', {'price': 32000})
+        etags.append(self.etag())
+
+        self.admin('delete', f'/api/admin/products/{product_id}/delete/')
+        etags.append(self.etag())
+
+        self.assertEqual(len(set(etags)), len(etags))
+        response = self.client.get('/api/products/products/', HTTP_IF_NONE_MATCH=etags[2])
+        response.close()
+        self.assertEqual(response.status_code, 200)
+
+
+class StorefrontBootstrapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_products(10).update(is_available=True)
+
+    def setUp(self):
+        # The bundle is kept per process: start each test without one
+        patcher = mock.patch.object(bootstrap, '_bundle', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, **headers):
+        response = self.client.get('/api/storefront/bootstrap/', **headers)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        return response
+
+    def test_gzip_variant_for_gzip_clients(self):
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.get().content)
+
+    def test_plain_json_without_accept_encoding(self):
+        response = self.get()
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        body = response.json()
+        self.assertEqual(set(body), {'products', 'banners', 'categories'})
+        self.assertEqual(len(body['products']), 10)
+
+    def test_payload_is_rebuilt_after_a_catalog_change(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        product = Product.objects.order_by('pk').first()
+        product.name = 'Trà vải'
+        product.save()
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Trà vải', [item['name'] for item in response.json()['products']])
+
+
+class ProductProjectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        products = list(seed_products(40).order_by('pk'))
+        # Names that need quoting in URLs, and thumbnails for every other product
+        products[0].image = 'products/ảnh trà sữa #1.jpg'
+        for product in products[::2]:
+            product.image_variants = {
+                'source': product.image.name, 'width': 800,
+                'webp': [[320, f'products/derivatives/{product.pk}-320w.webp']],
+                'jpeg': [[320, f'products/derivatives/{product.pk} 320w.jpg']],
+            }
+        Product.objects.bulk_update(products, ['image', 'image_variants'])
+
+    def test_projection_renders_the_same_bytes_as_the_serializer(self):
+        renderer = FastJSONRenderer()
+        queryset = Product.objects.select_related('category').order_by('pk')
+        for request in [None, RequestFactory().get('/api/products/products/')]:
+            with self.subTest(request=request):
+                projection = ProductProjection(request=request)
+                expected = ProductSerializer(queryset, many=True, context={'request': request}).data
+                self.assertEqual(
+                    renderer.render(projection.serialize(projection.values(queryset))), renderer.render(expected),
+                )
+
+    def test_sparse_projection_matches_the_sparse_serializer(self):
+        fields = ['id', 'formatted_price', 'discount_display', 'image_srcset']
+        queryset = Product.objects.select_related('category').order_by('pk')
+        projection = ProductProjection(fields=fields)
+        self.assertEqual(
+            projection.serialize(projection.values(queryset)),
+            ProductSerializer(queryset, many=True, fields=fields).data,
+        )
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Đồ uống')
+
+        def create(name, description):
+            return Product.objects.create(
+                name=name, description=description, category=category, price=30000, image='products/search.jpg',
+            )
+
+        cls.milk_tea = create('Trà sữa trân châu', 'Sữa tươi và trân châu đường đen')
+        cls.black_tea = create('Hồng trà', 'Trà đen pha thêm sữa đặc')
+        cls.coffee = create('Cà phê đen', 'Cà phê rang xay')
+
+    def search(self, query):
+        response = self.client.get('/api/products/products/', {'search': query})
+        return [product['id'] for product in json.loads(response.getvalue())]
+
+    def test_query_without_diacritics_matches(self):
+        self.assertCountEqual(self.search('tra sua'), [self.milk_tea.pk, self.black_tea.pk])
+        self.assertEqual(self.search('TRÀ SỮA TRÂN CHÂU'), [self.milk_tea.pk])
+
+    def test_last_word_matches_as_a_prefix(self):
+        self.assertEqual(self.search('ca ph'), [self.coffee.pk])
+        self.assertEqual(self.search('tra sua tran ch'), [self.milk_tea.pk])
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search('tra sua'), [self.milk_tea.pk, self.black_tea.pk])
+        self.assertEqual(self.search('den'), [self.coffee.pk, self.black_tea.pk, self.milk_tea.pk])
+
+    def test_index_follows_product_saves_and_deletes(self):
+        backend = get_search_backend()
+        matcha = Product.objects.create(
+            name='Trà sữa matcha', description='Bột trà xanh Nhật Bản', category=self.coffee.category,
+            price=35000, image='products/search.jpg',
+        )
+        self.assertEqual(backend.search('matcha'), [matcha.pk])
+
+        matcha.name = 'Trà sữa khoai môn'
+        matcha.save()
+        self.assertEqual(backend.search('matcha'), [])
+        self.assertEqual(backend.search('khoai mon'), [matcha.pk])
+
+        pk = matcha.pk
+        matcha.delete()
+        self.assertEqual(backend.search('khoai mon'), [])
+        self.assertNotIn(pk, self.search('tra sua'))
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, STREAMING_LIST_RESPONSES=True)
+class StreamingQueryBudgetTests(TestCase):
+    def test_queries_run_while_streaming_count_against_the_budget(self):
+        seed_products(5)
+        # Two catalog fingerprint queries run in the view, the product
+        # SELECT only once the body is consumed
+        with mock.patch.object(ProductListView, 'query_budget', 2):
+            response = self.client.get('/api/products/products/')
+            self.assertTrue(response.streaming)
+            with self.assertRaises(QueryBudgetExceeded):
+                b''.join(response.streaming_content)
+
+    def test_unread_stream_stops_recording_on_close(self):
+        response = self.client.get('/api/products/products/')
+        self.assertTrue(response.streaming)
+        response.close()
+        self.assertEqual(connection.execute_wrappers, [])
+
+    def test_each_further_chunk_extends_the_budget(self):
+        seed_products(5)
+        # Three chunks of two rows: the budget of 2 grows to 4, enough for
+        # the two fingerprint queries and the product SELECT.
+        with mock.patch.multiple(ProductListView, query_budget=2, streaming_chunk_size=2, streaming_queries_per_chunk=1):
+            response = self.client.get('/api/products/products/')
+            self.assertEqual(len(json.loads(response.getvalue())), 5)
+
+    def test_streamed_list_within_budget(self):
+        seed_products(5)
+        response = self.client.get('/api/products/products/')
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 5)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class CatalogQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_products(60)
+        Category.objects.refresh_product_counts()
+
+    def test_product_list(self):
+        category = Category.objects.first()
+        for query in ['', '?page_size=24', f'?category={category.pk}', '?fields=id,name,formatted_price', '?ordering=price']:
+            with self.subTest(query=query), assert_query_budget(ProductListView.query_budget):
+                response = self.client.get(f'/api/products/products/{query}')
+                self.assertEqual(response.status_code, 200)
+                response.getvalue()
+
+    def test_category_list(self):
+        with assert_query_budget(CategoryListView.query_budget):
+            response = self.client.get('/api/products/categories/')
+            self.assertEqual(response.status_code, 200)
+            response.getvalue()
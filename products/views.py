@@ -1,43 +1,96 @@
 from rest_framework import generics, filters
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_GET
 from django_filters.rest_framework import DjangoFilterBackend
+from trasua_project.query_budget import query_budget
+from trasua_project.renderers import StreamingListMixin
+from .bootstrap import get_bundle, negotiate_encoding
+from .catalog import conditional_catalog
+from .filters import ProductSearchFilter
 from .models import Category, Product, Banner
+from .pagination import OptInCursorPagination
+from .projections import ProductProjection
 from .serializers import CategorySerializer, ProductSerializer, BannerSerializer
 
 
+class ProductProjectionMixin(StreamingListMixin):
+    """List sản phẩm qua `ProductProjection` thay vì dựng model instance cho từng dòng"""
+
+    def get_requested_fields(self):
+        # Sparse fieldset: ?fields=id,name,formatted_price
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return [name.strip() for name in fields.split(',') if name.strip()]
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        projection = ProductProjection(fields=self.get_requested_fields(), request=request)
+        rows = projection.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(projection.serialize(page))
+        if self.should_stream():
+            return self.streaming_response(
+                rows.iterator(chunk_size=self.streaming_chunk_size), projection.serialize,
+            )
+        return Response(projection.serialize(rows))
+
+
+@method_decorator(conditional_catalog('categories'), name='get')
 class CategoryListView(generics.ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    query_budget = 3
 
 
-class ProductListView(generics.ListAPIView):
+@method_decorator(conditional_catalog('products'), name='get')
+class ProductListView(ProductProjectionMixin, generics.ListAPIView):
     queryset = Product.objects.filter(is_available=True)
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # Search runs last so that relevance ranking overrides the default ordering.
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
     filterset_fields = ['category', 'size', 'is_featured']
-    search_fields = ['name', 'description']
     ordering_fields = ['price', 'created_at', 'name']
-    ordering = ['-created_at']
+    ordering = ['-created_at', 'id']
+    pagination_class = OptInCursorPagination
+    query_budget = 4
 
 
+@method_decorator(conditional_catalog('products'), name='get')
 class ProductDetailView(generics.RetrieveAPIView):
-    queryset = Product.objects.filter(is_available=True)
+    queryset = Product.objects.select_related('category').filter(is_available=True)
     serializer_class = ProductSerializer
+    query_budget = 2
 
 
-class FeaturedProductsView(generics.ListAPIView):
+@method_decorator(conditional_catalog('products'), name='get')
+class FeaturedProductsView(ProductProjectionMixin, generics.ListAPIView):
     queryset = Product.objects.filter(is_available=True, is_featured=True)
     serializer_class = ProductSerializer
     ordering = ['-created_at']
+    query_budget = 3
 
 
+@method_decorator(conditional_catalog('banners'), name='get')
 class BannerListView(generics.ListAPIView):
     queryset = Banner.objects.filter(is_active=True)
     serializer_class = BannerSerializer
     ordering = ['order', '-created_at']
+    query_budget = 2
 
 
+@query_budget(3)
 @api_view(['GET'])
 def product_stats(request):
     """API endpoint để lấy thống kê sản phẩm"""
@@ -49,4 +102,25 @@ def product_stats(request):
         'total_products': total_products,
         'featured_products': featured_products,
         'categories': categories
-    })
\ No newline at end of file
+    })
+
+@query_budget(6)
+@require_GET
+def storefront_bootstrap(request):
+    """API endpoint trả về sản phẩm, banner và danh mục trong một payload đã nén sẵn"""
+    bundle = get_bundle()
+    response = HttpResponse(content_type='application/json')
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, no_cache=True)
+    response['ETag'] = bundle.etag
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if bundle.etag in [tag.strip() for tag in if_none_match.split(',')]:
+        response.status_code = 304
+        return response
+
+    encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'), bundle.encodings)
+    response.content = bundle.encodings[encoding]
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    return response
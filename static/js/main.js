@@ -38,11 +38,28 @@ function handleClick(e) {
     }
 }
 
+// Products, banners and categories come from one precompressed payload;
+// concurrent callers share the same request
+let storefrontRequest = null;
+
+function fetchStorefront() {
+    if (!storefrontRequest) {
+        storefrontRequest = fetch('/api/storefront/bootstrap/').then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        });
+        storefrontRequest.catch(() => { storefrontRequest = null; });
+    }
+    return storefrontRequest;
+}
+
 // Load products from API
 async function loadProducts() {
+    // Server-rendered home page: the cards are already in the DOM
+    if (hydrateProducts()) return;
+    
     try {
-        const response = await fetch('/api/products/products/');
-        products = await response.json();
+        products = (await fetchStorefront()).products;
         renderProducts();
     } catch (error) {
         console.error('Error loading products:', error);
@@ -52,15 +69,30 @@ async function loadProducts() {
 
 // Load banners from API
 async function loadBanners() {
+    if (document.querySelector('#banners-container[data-rendered="server"]')) return;
+    
     try {
-        const response = await fetch('/api/products/banners/');
-        banners = await response.json();
+        banners = (await fetchStorefront()).banners;
         renderBanners();
     } catch (error) {
         console.error('Error loading banners:', error);
     }
 }
 
+// Use the product data embedded next to server-rendered cards
+function hydrateProducts() {
+    const data = document.getElementById('storefront-products');
+    if (!data) return false;
+    
+    products = JSON.parse(data.textContent);
+    products.forEach(product => {
+        if (cart.find(item => item.id === product.id)) {
+            updateProductStatus(product.id, true);
+        }
+    });
+    return true;
+}
+
 // Render products
 function renderProducts() {
     const container = document.getElementById('products-container');
@@ -115,7 +147,7 @@ function createProductCard(product) {
     div.innerHTML = `
         <div class="product-card">
             <div class="product-image-container">
-                <img src="${product.image}" alt="${product.name}" class="product-image">
+                ${responsiveImage(product.image, product.image_srcset, product.name, 'product-image', '(max-width: 768px) 100vw, 25vw')}
                 ${statusBadge}
             </div>
             <div class="product-info">
@@ -142,6 +174,20 @@ function createProductCard(product) {
     return div;
 }
 
+// Build <picture> with WebP/JPEG derivatives when the server has generated them
+function responsiveImage(src, srcset, alt, className, sizes) {
+    const img = `<img src="${src}" alt="${alt}" class="${className}" loading="lazy" decoding="async"`;
+    if (!srcset) {
+        return `${img}>`;
+    }
+    return `
+        <picture>
+            ${srcset.webp ? `<source type="image/webp" srcset="${srcset.webp}" sizes="${sizes}">` : ''}
+            ${img} srcset="${srcset.jpeg || ''}" sizes="${sizes}">
+        </picture>
+    `;
+}
+
 // Get status badge class for frontend
 function getStatusBadgeClass(status) {
     switch(status) {
@@ -158,7 +204,7 @@ function createBannerCard(banner) {
     div.className = 'col-md-6 mb-4';
     div.innerHTML = `
         <div class="banner-card">
-            <img src="${banner.image}" alt="${banner.title}" class="banner-image">
+            ${responsiveImage(banner.image, banner.image_srcset, banner.title, 'banner-image', '(max-width: 768px) 100vw, 50vw')}
             <div class="banner-content">
                 <h3 class="banner-title">${banner.title}</h3>
                 <p class="banner-subtitle">${banner.subtitle}</p>
@@ -359,6 +405,20 @@ function showAlert(message, type = 'info') {
     }
 }
 
+// Reuse the same Idempotency-Key when the same order is re-submitted after a
+// timeout, so the server creates it only once
+function getOrderIdempotencyKey(body) {
+    const pending = JSON.parse(sessionStorage.getItem('pendingOrder') || 'null');
+    if (pending && pending.body === body) {
+        return pending.key;
+    }
+    const key = window.crypto && crypto.randomUUID
+        ? crypto.randomUUID()
+        : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    sessionStorage.setItem('pendingOrder', JSON.stringify({ key: key, body: body }));
+    return key;
+}
+
 // Submit order
 async function submitOrder(formData) {
     try {
@@ -378,15 +438,20 @@ async function submitOrder(formData) {
         const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]')?.value || 
                          document.querySelector('meta[name=csrf-token]')?.getAttribute('content');
         
+        const body = JSON.stringify(orderData);
         const response = await fetch('/api/orders/create/', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-                'X-CSRFToken': csrfToken
+                'X-CSRFToken': csrfToken,
+                'Idempotency-Key': getOrderIdempotencyKey(body)
             },
-            body: JSON.stringify(orderData)
+            body: body
         });
         
+        // The server answered, so a retry of this attempt is no longer needed
+        sessionStorage.removeItem('pendingOrder');
+        
         if (response.ok) {
             const order = await response.json();
             // Clear cart
@@ -398,7 +463,7 @@ async function submitOrder(formData) {
             window.location.href = `/order-success/?order_id=${order.id}`;
         } else {
             const error = await response.json();
-            showAlert('Có lỗi xảy ra khi đặt hàng: ' + (error.detail || 'Vui lòng thử lại'), 'danger');
+            showAlert('Có lỗi xảy ra khi đặt hàng: ' + (error.detail || error.error || 'Vui lòng thử lại'), 'danger');
         }
     } catch (error) {
         console.error('Error submitting order:', error);
@@ -410,7 +475,8 @@ async function submitOrder(formData) {
 async function loadOrders() {
     try {
         const response = await fetch('/api/orders/');
-        const orders = await response.json();
+        // First page of the (always paginated) order list
+        const orders = (await response.json()).results;
         renderOrders(orders);
     } catch (error) {
         console.error('Error loading orders:', error);
@@ -0,0 +1,201 @@
+"""
+Ngân sách truy vấn SQL cho từng request và phát hiện N+1.
+
+- `QueryRecorder` đếm và đo thời gian các câu SQL (qua `execute_wrapper`).
+- `query_budget(n)` khai báo số truy vấn tối đa của một view; với class-based
+  view thì khai báo thuộc tính `query_budget = n`.
+- `QueryBudgetMiddleware` ghi log các vi phạm (vượt ngân sách hoặc một dạng
+  câu SQL lặp lại nhiều lần), hoặc raise `QueryBudgetExceeded` khi
+  `QUERY_BUDGET_STRICT` bật (dùng trong CI). Với response streaming, các
+  truy vấn được đếm tới khi stream kết thúc; `allow_streamed_chunk()` cho
+  thêm ngân sách với mỗi chunk sau chunk đầu.
+- `assert_query_budget(n)` là helper cho test.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import FileResponse
+
+
+logger = logging.getLogger('trasua.query_budget')
+
+DEFAULT_REPEAT_THRESHOLD = 5
+
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_SPACE_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_shape(sql):
+    """Chuẩn hóa câu SQL để các truy vấn chỉ khác tham số có cùng một dạng"""
+    shape = _IN_LIST_RE.sub('IN (...)', sql)
+    shape = _STRING_RE.sub('?', shape)
+    shape = _NUMBER_RE.sub('?', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+class QueryRecorder:
+    """Ghi lại (sql, thời gian) của mọi truy vấn trên tất cả database"""
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    def start(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+
+    def stop(self):
+        if self._stack is not None:
+            self._stack.close()
+            self._stack = None
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(duration for _, duration in self.queries)
+
+    def repeated_shapes(self, threshold=DEFAULT_REPEAT_THRESHOLD):
+        shapes = Counter(query_shape(sql) for sql, _ in self.queries)
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+    def violations(self, budget=None, repeat_threshold=DEFAULT_REPEAT_THRESHOLD):
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f'{self.count} queries, budget is {budget}')
+        for shape, count in self.repeated_shapes(repeat_threshold):
+            problems.append(f'N+1: {count}x {shape[:300]}')
+        return problems
+
+
+def query_budget(max_queries):
+    """Decorator khai báo số truy vấn tối đa của một function view"""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def get_query_budget(view_func):
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        view_class = getattr(view_func, 'view_class', None)
+        budget = getattr(view_class, 'query_budget', None)
+    return budget
+
+
+def allow_streamed_chunk(request, queries):
+    """
+    Một chunk nữa của response streaming: ngân sách của request tăng thêm
+    `queries` truy vấn, và ngưỡng N+1 tăng thêm 1 (các truy vấn chạy một lần
+    mỗi chunk, như prefetch của `QuerySet.iterator()`, không phải N+1)
+    """
+    request = getattr(request, '_request', request)
+    if getattr(request, '_query_recorder', None) is None:
+        return
+    if request._query_budget is not None:
+        request._query_budget += queries
+    request._query_extra_chunks += 1
+
+
+def _repeat_threshold():
+    return getattr(settings, 'QUERY_BUDGET_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD)
+
+
+@contextmanager
+def assert_query_budget(max_queries=None, repeat_threshold=None):
+    """
+    Helper cho test:
+
+        with assert_query_budget(3):
+            self.client.get('/api/products/products/')
+    """
+    recorder = QueryRecorder()
+    recorder.start()
+    try:
+        yield recorder
+    finally:
+        recorder.stop()
+    problems = recorder.violations(max_queries, repeat_threshold or _repeat_threshold())
+    if problems:
+        raise QueryBudgetExceeded('; '.join(problems))
+
+
+class QueryBudgetMiddleware:
+    """Đếm và đo thời gian SQL của mỗi view, so với ngân sách đã khai báo"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        recorder = getattr(request, '_query_recorder', None)
+        if recorder is None:
+            return response
+        if response.streaming and not isinstance(response, FileResponse):
+            # Streamed lists run their queries while the body is consumed:
+            # keep recording until the stream ends (no Server-Timing, the
+            # headers are already out by then). Files run no queries and keep
+            # going through wsgi.file_wrapper.
+            response.streaming_content = self._record_stream(request, recorder, response.streaming_content)
+            # The body may never be read (HEAD, client gone): stop on close() too.
+            response._resource_closers.append(recorder.stop)
+            return response
+        recorder.stop()
+
+        if settings.DEBUG:
+            response['Server-Timing'] = (
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"'
+            )
+        self._check(request, recorder)
+        return response
+
+    def _record_stream(self, request, recorder, content):
+        try:
+            yield from content
+        finally:
+            recorder.stop()
+        self._check(request, recorder)
+
+    def _check(self, request, recorder):
+        problems = recorder.violations(request._query_budget, _repeat_threshold() + request._query_extra_chunks)
+        if problems:
+            message = f'{request.method} {request.path} ({request._query_view}): ' + '; '.join(problems)
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Load the session user first so budgets only count the view's own queries.
+        user = getattr(request, 'user', None)
+        if user is not None:
+            user.is_authenticated
+
+        request._query_budget = get_query_budget(view_func)
+        view_class = getattr(view_func, 'view_class', None)
+        request._query_view = getattr(view_class, '__name__', None) or view_func.__name__
+        request._query_extra_chunks = 0
+        request._query_recorder = QueryRecorder()
+        request._query_recorder.start()
@@ -0,0 +1,146 @@
+"""
+Renderer/parser cho REST API.
+
+- `FastJSONRenderer` tạo JSON giống hệt `JSONRenderer` của DRF nhưng dùng
+  orjson khi có cài (quay về encoder chuẩn khi không có hoặc khi cần indent).
+- `MessagePackRenderer` / `MessagePackParser` cho client gửi
+  `Accept: application/msgpack` (kiosk); cần package `msgpack`.
+- `ContentNegotiation` bỏ qua các renderer/parser thiếu dependency.
+- `StreamingListMixin` encode response danh sách theo từng chunk
+  (`StreamingHttpResponse`) thay vì dựng cả chuỗi JSON trong bộ nhớ.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ParseError
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .query_budget import allow_streamed_chunk
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+DEFAULT_STREAMING_CHUNK_SIZE = 200
+
+# Types the stock encoder handles itself (Decimal, lazy strings, ...).
+_encoder = JSONEncoder()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """`JSONRenderer` dùng orjson; kết quả giống từng byte với encoder chuẩn"""
+
+    available = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # Datetimes go through the stock encoder so the format ("...Z") is unchanged.
+            ret = orjson.dumps(data, default=_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer: keep the output a strict JavaScript subset.
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    available = msgpack is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True, datetime=False)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+    available = msgpack is not None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except ValueError as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
+
+
+class ContentNegotiation(DefaultContentNegotiation):
+    """Bỏ qua renderer/parser có `available = False` (thiếu package tùy chọn)"""
+
+    def select_parser(self, request, parsers):
+        return super().select_parser(request, [p for p in parsers if getattr(p, 'available', True)])
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        renderers = [r for r in renderers if getattr(r, 'available', True)]
+        return super().select_renderer(request, renderers, format_suffix)
+
+
+def _chunks(items, size):
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def stream_json_list(chunks, encode):
+    """Encode từng chunk thành mảng JSON rồi nối lại thành một mảng duy nhất"""
+    yield b'['
+    first = True
+    for chunk in chunks:
+        body = encode(chunk)[1:-1]
+        if not body:
+            continue
+        if not first:
+            yield b','
+        yield body
+        first = False
+    yield b']'
+
+
+class StreamingListMixin:
+    """
+    Cho list view: khi `STREAMING_LIST_RESPONSES` bật và client nhận JSON,
+    response không phân trang được encode dần theo từng chunk.
+    """
+
+    streaming_chunk_size = DEFAULT_STREAMING_CHUNK_SIZE
+    # Queries each chunk after the first runs (prefetch_related with iterator())
+    streaming_queries_per_chunk = 0
+
+    def should_stream(self):
+        return (
+            getattr(settings, 'STREAMING_LIST_RESPONSES', False)
+            and type(self.request.accepted_renderer) in (JSONRenderer, FastJSONRenderer)
+            and self.request.accepted_renderer.get_indent(self.request.accepted_media_type, {}) is None
+        )
+
+    def streaming_response(self, items, serialize):
+        """`items`: iterable các dòng; `serialize`: list dòng -> list dict"""
+        renderer = self.request.accepted_renderer
+        return StreamingHttpResponse(
+            stream_json_list(self._serialized_chunks(items, serialize), renderer.render),
+            content_type=renderer.media_type,
+        )
+
+    def _serialized_chunks(self, items, serialize):
+        for number, chunk in enumerate(_chunks(items, self.streaming_chunk_size)):
+            if number:
+                allow_streamed_chunk(self.request, self.streaming_queries_per_chunk)
+            yield serialize(chunk)
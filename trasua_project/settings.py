@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -56,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'trasua_project.query_budget.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'trasua_project.urls'
@@ -86,6 +90,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock at BEGIN so concurrent writers wait (busy
+            # timeout) instead of failing with "database is locked".
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -133,6 +142,72 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploaded media is stored under content-hash names (see products/storage.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'products.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Serve MEDIA_URL from Django (with immutable cache headers). On by default in
+# DEBUG only; production should let the front-end server serve MEDIA_ROOT with
+# `Cache-Control: public, max-age=31536000, immutable` for the content-hashed
+# names (see products/storage.py), or opt in explicitly with SERVE_MEDIA=1.
+SERVE_MEDIA = DEBUG or os.environ.get('SERVE_MEDIA') == '1'
+
+# Responsive image derivatives (see products/images.py)
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 960)
+IMAGE_DERIVATIVE_WORKERS = 2
+
+# Per-view SQL query budgets (see trasua_project/query_budget.py).
+# CI sets QUERY_BUDGET_STRICT=1 so that violations fail the tests.
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT') == '1'
+QUERY_BUDGET_REPEAT_THRESHOLD = 5
+
+# Product search index backend (see products/search.py)
+PRODUCT_SEARCH_BACKEND = 'products.search.SQLiteFTSBackend'
+
+# Render the home page product grid and banners on the server, with fragments
+# cached per category/page (see frontend/storefront.py)
+STOREFRONT_SERVER_RENDERING = True
+STOREFRONT_PAGE_SIZE = 24
+STOREFRONT_FRAGMENT_TTL = 300
+
+# How long an Idempotency-Key of /api/orders/create/ is remembered, in seconds
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Admin dashboard statistics cache lifetime in seconds (see orders/dashboard.py)
+DASHBOARD_STATS_TTL = 30
+
+# Real-time order feed (see orders/events.py): events kept for resuming, and
+# how long one Server-Sent Events response stays open before the browser reconnects
+ORDER_EVENTS_BACKLOG = 1000
+ORDER_EVENTS_STREAM_DURATION = 300
+
+# How long deleted orders are remembered for /api/orders/sync/, in seconds;
+# clients with older cursors start over (see orders/sync.py)
+ORDER_TOMBSTONE_TTL = 30 * 24 * 60 * 60
+
+# Kitchen queue ETA (see orders/kitchen.py): recent preparations the throughput
+# is measured over, and the seconds per cup assumed before any were timed
+KITCHEN_THROUGHPUT_SAMPLE = 30
+KITCHEN_DEFAULT_SECONDS_PER_ITEM = 90
+
+# Automatic 'hot' products (see orders/hot_products.py): top N by cups sold in
+# the last WINDOW seconds, counted in BUCKET-second slots; a hot product keeps
+# its status until it drops below rank N + MARGIN. Re-ranked at most every
+# INTERVAL seconds. AUTO = False leaves the status to the admin.
+HOT_PRODUCTS_AUTO = True
+HOT_PRODUCTS_WINDOW = 2 * 60 * 60
+HOT_PRODUCTS_BUCKET = 5 * 60
+HOT_PRODUCTS_TOP_N = 5
+HOT_PRODUCTS_MARGIN = 3
+HOT_PRODUCTS_MIN_QUANTITY = 3
+HOT_PRODUCTS_INTERVAL = 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -140,6 +215,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # REST Framework settings
 REST_FRAMEWORK = {
@@ -147,6 +223,17 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'trasua_project.renderers.FastJSONRenderer',
+        'trasua_project.renderers.MessagePackRenderer',
     ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'trasua_project.renderers.MessagePackParser',
+    ],
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS': 'trasua_project.renderers.ContentNegotiation',
 }
+
+# Encode unpaginated JSON list responses chunk by chunk (see trasua_project/renderers.py)
+STREAMING_LIST_RESPONSES = True
@@ -15,18 +15,27 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from products.storage import serve_media
+from products.views import storefront_bootstrap
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/products/', include('products.urls')),
     path('api/orders/', include('orders.urls')),
+    path('api/storefront/bootstrap/', storefront_bootstrap, name='storefront-bootstrap'),
     path('', include('frontend.urls')),
 ]
 
-# Serve media files in development
+# Serve media files (content-hashed names get far-future cache headers)
+if settings.SERVE_MEDIA:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media,
+                {'document_root': settings.MEDIA_ROOT}),
+    ]
+
+# Serve static files in development
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)